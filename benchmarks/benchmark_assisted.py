@@ -0,0 +1,68 @@
+# benchmarks/benchmark_assisted.py
+"""
+Compare greedy decoding with and without a draft model (assisted decoding) on CPU.
+
+    python -m benchmarks.benchmark_assisted --config config/llm_advisor_config_llama_3.yaml --draft-model-path ./models/Llama-3.2-1B-Instruct
+"""
+import argparse
+import json
+import time
+import yaml
+from benchmarks.benchmark_quantization import SAMPLE_SUFFIX
+from src.advisor import PROMPT_PREFIX
+from src.model_loader import LLMModelLoader
+
+def measure(loader, max_new_tokens, runs):
+    """Decode throughput, output ids and (with a draft model) mean acceptance rate of one loader."""
+    loader.set_prompt_prefix(PROMPT_PREFIX)
+    generate_kwargs = {"max_new_tokens": max_new_tokens, "do_sample": False}
+    loader.generate(SAMPLE_SUFFIX, max_new_tokens=2)  # warm-up
+    elapsed = []
+    tokens = 0
+    acceptance_rates = []
+    for _ in range(runs):
+        timings = {}
+        start_time = time.time()
+        output_ids = loader.generate(SAMPLE_SUFFIX, timings=timings, **generate_kwargs)
+        elapsed.append(time.time() - start_time)
+        tokens += timings["generated_tokens"]
+        if timings.get("acceptance_rate") is not None:
+            acceptance_rates.append(timings["acceptance_rate"])
+    return {
+        "tokens_per_second": round(tokens / sum(elapsed), 2),
+        "mean_seconds": round(sum(elapsed) / runs, 3),
+        "acceptance_rate": round(sum(acceptance_rates) / len(acceptance_rates), 3) if acceptance_rates else None,
+    }, output_ids
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--config", default="config/llm_advisor_config_llama_3.yaml")
+    parser.add_argument("--model-path", help="Overrides model_path from the config")
+    parser.add_argument("--draft-model-path", help="Overrides draft_model_path from the config")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as file:
+        config = yaml.safe_load(file)
+    model_path = args.model_path or config["model_path"]
+    draft_model_path = args.draft_model_path or config.get("draft_model_path")
+    if not draft_model_path:
+        parser.error("No draft model: set draft_model_path in the config or pass --draft-model-path")
+
+    # Both loaders share the main model through the process-wide registry
+    greedy, greedy_ids = measure(LLMModelLoader(model_path, use_gpu=False, lazy=True), args.max_new_tokens, args.runs)
+    assisted, assisted_ids = measure(
+        LLMModelLoader(model_path, use_gpu=False, lazy=True, draft_model_path=draft_model_path),
+        args.max_new_tokens, args.runs
+    )
+    results = {
+        "greedy": greedy,
+        "assisted": assisted,
+        "speedup": round(assisted["tokens_per_second"] / greedy["tokens_per_second"], 3),
+        "identical_output": bool((greedy_ids == assisted_ids).all()) if greedy_ids.shape == assisted_ids.shape else False,
+    }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
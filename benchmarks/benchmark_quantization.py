@@ -0,0 +1,86 @@
+# benchmarks/benchmark_quantization.py
+"""
+Compare memory footprint and generation speed of the unquantized and int8 models.
+
+    python -m benchmarks.benchmark_quantization --config config/llm_advisor_config_llama_3.yaml
+
+The int8 model is quantized into a temporary directory, then reloaded from the saved
+weights; `reload_speedup` compares the two load times.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import yaml
+from src.advisor import PROMPT_PREFIX
+from src.model_loader import LLMModelLoader, clear_model_registry
+
+SAMPLE_SUFFIX = """当前状态：
+玩家牌：2 Spade，2 Heart（总计 4 点）
+庄家牌：8 Heart，9 Spade（总计 7 点）
+
+您的建议："""
+
+def model_memory_bytes(model):
+    """Bytes held by a model's weights, including packed int8 weights of quantized layers."""
+    def tensor_bytes(value):
+        if isinstance(value, (tuple, list)):
+            return sum(tensor_bytes(item) for item in value)
+        if hasattr(value, "element_size"):
+            return value.element_size() * value.numel()
+        return 0
+    return sum(tensor_bytes(value) for value in model.state_dict().values())
+
+def measure(loader, max_new_tokens, runs):
+    """Load time, weight memory and decode throughput of one loader."""
+    start_time = time.time()
+    loader.load()
+    load_time = time.time() - start_time
+    loader.set_prompt_prefix(PROMPT_PREFIX)
+    # Force exactly max_new_tokens per run so throughput is comparable
+    generate_kwargs = {"max_new_tokens": max_new_tokens, "min_new_tokens": max_new_tokens, "do_sample": False}
+    loader.generate(SAMPLE_SUFFIX, max_new_tokens=2)  # warm-up
+    elapsed = []
+    for _ in range(runs):
+        start_time = time.time()
+        loader.generate(SAMPLE_SUFFIX, **generate_kwargs)
+        elapsed.append(time.time() - start_time)
+    return {
+        "load_seconds": round(load_time, 3),
+        "weight_bytes": model_memory_bytes(loader.model),
+        "tokens_per_second": round(max_new_tokens * runs / sum(elapsed), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--config", default="config/llm_advisor_config_llama_3.yaml")
+    parser.add_argument("--model-path", help="Overrides model_path from the config")
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as file:
+        config = yaml.safe_load(file)
+    model_path = args.model_path or config["model_path"]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        # The first int8 load quantizes and saves; the second reloads the saved weights
+        quantized_model_path = os.path.join(directory, "int8.pt")
+        for name, quantization in (("unquantized", None), ("int8_dynamic", "int8_dynamic"),
+                                   ("int8_dynamic_reload", "int8_dynamic")):
+            loader = LLMModelLoader(model_path, use_gpu=False, lazy=True, quantization=quantization,
+                                    quantized_model_path=quantized_model_path if quantization else None)
+            results[name] = measure(loader, args.max_new_tokens, args.runs)
+            del loader
+            clear_model_registry()
+
+    base, quantized = results["unquantized"], results["int8_dynamic"]
+    results["memory_ratio"] = round(quantized["weight_bytes"] / base["weight_bytes"], 3)
+    results["speedup"] = round(quantized["tokens_per_second"] / base["tokens_per_second"], 3)
+    results["reload_speedup"] = round(quantized["load_seconds"] / results["int8_dynamic_reload"]["load_seconds"], 3)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
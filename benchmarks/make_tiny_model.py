@@ -0,0 +1,55 @@
+# benchmarks/make_tiny_model.py
+"""
+Build the tiny randomly initialized causal LM used by tests and benchmarks.
+
+    python -m benchmarks.make_tiny_model
+
+It has the Llama architecture of the production model but only ~50k parameters and a
+512-token byte-level BPE vocabulary, so the full advice pipeline runs offline in
+milliseconds. Its output is noise; only its timing and plumbing matter.
+"""
+import os
+
+TINY_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tiny_model")
+
+def build_tiny_model(path):
+    """Save a tiny randomly initialized Llama model and byte-level BPE tokenizer to `path`."""
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, processors, trainers
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+    from src.advisor import PROMPT_PREFIX
+
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=512,
+        special_tokens=["<s>", "</s>", "<pad>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet(),
+    )
+    tokenizer.train_from_iterator([PROMPT_PREFIX, "A Spade，8 Heart 玩家 庄家 和局 0.1234%"], trainer=trainer)
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="<s> $A", special_tokens=[("<s>", tokenizer.token_to_id("<s>"))]
+    )
+    PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, bos_token="<s>", eos_token="</s>", pad_token="<pad>"
+    ).save_pretrained(path)
+
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=tokenizer.get_vocab_size(),
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        max_position_embeddings=2048,
+        bos_token_id=tokenizer.token_to_id("<s>"),
+        eos_token_id=tokenizer.token_to_id("</s>"),
+        pad_token_id=tokenizer.token_to_id("<pad>"),
+    )
+    LlamaForCausalLM(config).save_pretrained(path)
+    return str(path)
+
+if __name__ == "__main__":
+    print(f"Tiny model saved to {build_tiny_model(TINY_MODEL_PATH)}")
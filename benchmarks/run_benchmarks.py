@@ -0,0 +1,230 @@
+# benchmarks/run_benchmarks.py
+"""
+Offline benchmark suite for the simulation and advice pipeline.
+
+    python -m benchmarks.run_benchmarks                      # writes benchmarks/results/<commit>.json
+    python -m benchmarks.run_benchmarks --compare old.json   # also prints the change per benchmark
+
+End-to-end get_advice runs against the tiny model in benchmarks/tiny_model, so no
+download or GPU is needed. Latencies are in milliseconds.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import yaml
+from benchmarks.make_tiny_model import TINY_MODEL_PATH
+from src.advisor import BaccaratLLMAdvisor
+from src.baccarat_rules import calculate_hand_value
+from src.baccarat_stats import calculate_win_probabilities, calculate_win_probabilities_batch, hands_to_array
+from tests.test_scenarios import test_scenarios
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def _current_rss_bytes():
+    """Resident set size of this process from /proc, or None where it is not available."""
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+class _RssSampler:
+    """Track the highest RSS of the process in a background thread while in use."""
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while True:
+            rss = _current_rss_bytes()
+            if rss is not None:
+                self.peak = rss if self.peak is None else max(self.peak, rss)
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+def bench(func, iterations, items_per_call=1, track_rss=False):
+    """
+    Time `func` over `iterations` calls; report latency percentiles, throughput and the
+    peak of Python allocations (tracemalloc, which does not see torch tensors).
+
+    With `track_rss`, the peak process RSS during a pass of calls, and its growth over
+    the RSS before the pass, are reported too; they include model activations and KV caches.
+    """
+    func()  # warm-up
+    elapsed = []
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        func()
+        elapsed.append(time.perf_counter() - start_time)
+
+    # tracemalloc slows every allocation down, so memory is measured in a separate short pass
+    tracemalloc.start()
+    for _ in range(min(iterations, 10)):
+        func()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rss = {}
+    if track_rss:
+        rss_before = _current_rss_bytes()
+        with _RssSampler() as sampler:
+            for _ in range(min(iterations, 10)):
+                func()
+        growth = None
+        if sampler.peak is not None and rss_before is not None:
+            growth = sampler.peak - rss_before
+        rss = {"peak_rss_bytes": sampler.peak, "rss_growth_bytes": growth}
+
+    elapsed.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": round(_percentile(elapsed, 0.50) * 1000, 4),
+        "p99_ms": round(_percentile(elapsed, 0.99) * 1000, 4),
+        "mean_ms": round(sum(elapsed) / iterations * 1000, 4),
+        "throughput_per_s": round(items_per_call * iterations / sum(elapsed), 2),
+        "peak_python_alloc_bytes": peak_bytes,
+        **rss,
+    }
+
+def _scenario_hands(scenario):
+    player = [card.classid for card in scenario if card.index in (1, 3, 5)]
+    banker = [card.classid for card in scenario if card.index in (2, 4, 6)]
+    return player, banker
+
+def _make_advisor(workdir, **overrides):
+    config = {"model_path": TINY_MODEL_PATH, "use_gpu": False, "max_new_tokens": 32, "lazy_load": False}
+    config.update(overrides)
+    config_path = os.path.join(workdir, f"config_{len(os.listdir(workdir))}.yaml")
+    with open(config_path, "w", encoding="utf-8") as file:
+        yaml.safe_dump(config, file)
+    return BaccaratLLMAdvisor(config_path)
+
+def _cycle(items):
+    """Call-counter closure returning the next item on each call."""
+    state = {"i": 0}
+    def next_item():
+        item = items[state["i"] % len(items)]
+        state["i"] += 1
+        return item
+    return next_item
+
+def run_benchmarks(quick=False):
+    scale = 0.1 if quick else 1.0
+    iters = lambda n: max(5, int(n * scale))
+    hands = [_scenario_hands(scenario) for scenario in test_scenarios]
+    # Hands where third cards are still to come exercise the probability engines
+    open_hands = [hand for hand in hands if len(hand[0]) == 2 and len(hand[1]) == 2]
+    results = {}
+
+    next_hand = _cycle(hands)
+    results["calculate_hand_value"] = bench(lambda: calculate_hand_value(next_hand()[0]), iters(100000))
+
+    next_open = _cycle(open_hands)
+    results["win_probabilities_exact"] = bench(
+        lambda: calculate_win_probabilities(*next_open(), [], method="exact"), iters(2000)
+    )
+    for num_simulations in (1000, 10000):
+        results[f"win_probabilities_monte_carlo_{num_simulations}"] = bench(
+            lambda: calculate_win_probabilities(*next_open(), [], method="monte_carlo", num_simulations=num_simulations),
+            iters(200000 // num_simulations),
+        )
+    results["win_probabilities_adaptive"] = bench(
+        lambda: calculate_win_probabilities(*next_open(), [], method="adaptive", num_simulations=200000, seed=0),
+        iters(50),
+    )
+    player_batch = hands_to_array([player for player, _ in open_hands] * 16)
+    banker_batch = hands_to_array([banker for _, banker in open_hands] * 16)
+    results["win_probabilities_batch_10000"] = bench(
+        lambda: calculate_win_probabilities_batch(player_batch, banker_batch, num_simulations=10000),
+        iters(20),
+        items_per_call=len(player_batch),
+    )
+
+    with tempfile.TemporaryDirectory() as workdir:
+        advisor = _make_advisor(workdir)
+        states = [advisor._format_cards_for_prompt(scenario) for scenario in test_scenarios]
+        next_state = _cycle(states)
+        probabilities = {"player": 28.28, "banker": 63.12, "tie": 8.6}
+        results["create_prompt"] = bench(lambda: advisor._create_prompt(next_state(), probabilities), iters(20000))
+
+        next_scenario = _cycle(list(enumerate(test_scenarios)))
+        def advise(advisor):
+            i, scenario = next_scenario()
+            return advisor.get_advice(f"T{i}", scenario)
+        results["get_advice_tiny_model"] = bench(lambda: advise(advisor), iters(100), track_rss=True)
+        uncached = _make_advisor(workdir, prefix_cache=False)
+        results["get_advice_tiny_model_no_prefix_cache"] = bench(lambda: advise(uncached), iters(100), track_rss=True)
+        rules = _make_advisor(workdir, llm_mode="never")
+        results["get_advice_rules_only"] = bench(lambda: advise(rules), iters(5000))
+
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+def compare(results, baseline):
+    """Print the p50 change of every benchmark present in both runs."""
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]["p50_ms"], result["p50_ms"]
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"{name:45s} p50 {old:10.4f} -> {new:10.4f} ms ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="JSON output path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--quick", action="store_true", help="Run 10%% of the iterations")
+    args = parser.parse_args()
+
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "benchmarks": run_benchmarks(quick=args.quick),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(json.dumps(report["benchmarks"], indent=2))
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            compare(report["benchmarks"], json.load(file)["benchmarks"])
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,23 @@
 # main.py
 import logging
+import yaml
 from src.utils import setup_logging
 from src.advisor import BaccaratLLMAdvisor
 from tests.test_scenarios import run_baccarat_tests
 
 if __name__ == "__main__":
-    setup_logging()  # Enable logging
     # config_path = "config/llm_advisor_config_qwen.yaml"  # Path to the config file
     config_path = "config/llm_advisor_config_llama_3.yaml"  # Path to the config file
+    with open(config_path, "r", encoding="utf-8") as file:
+        config = yaml.safe_load(file)
+    setup_logging(  # Enable logging
+        rotation=config.get("log_rotation", "size"),
+        max_bytes=config.get("log_max_bytes", 50 * 1024 * 1024),
+        backup_count=config.get("log_backup_count", 10),
+        flush_interval=config.get("log_flush_interval", 1.0),
+        sample_rates=config.get("log_sample_rates"),
+        advice_records_path=config.get("advice_records_path"),
+    )
     advisor = BaccaratLLMAdvisor(config_path)  # Initialize advisor with config
-    run_baccarat_tests(advisor)  # Run test scenarios
\ No newline at end of file
+    run_baccarat_tests(advisor)  # Run test scenarios
+    advisor.export_metrics()  # Write per-stage latency histograms
\ No newline at end of file
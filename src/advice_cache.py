@@ -0,0 +1,112 @@
+# src/advice_cache.py
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from src.baccarat_rules import calculate_hand_value, card_rank
+
+logger = logging.getLogger(__name__)
+
+def canonical_key(player_hand, banker_hand, shoe, shoe_bucket=8, context=()):
+    """
+    Canonical, suit-free key of a game state.
+
+    The first two cards of each side are order-free, so their ranks are sorted; a third
+    card stays separate because it drives Banker's drawing rule. The shoe is reduced to
+    its point-value counts divided by `shoe_bucket`, so nearby shoes share entries.
+
+    Args:
+        player_hand (list): Player's int cards.
+        banker_hand (list): Banker's int cards.
+        shoe (ShoeState): Remaining shoe of the table.
+        shoe_bucket (int): Cards per bucket of each point-value count.
+        context (tuple): Anything else the advice depends on (model, prompt version, ...).
+    """
+    def side(hand):
+        ranks = [card_rank(card) for card in hand]
+        return [sorted(ranks[:2]), ranks[2:], calculate_hand_value(hand)]
+
+    buckets = [count // shoe_bucket for count in shoe.value_counts()]
+    return json.dumps([side(player_hand), side(banker_hand), buckets, list(context)], separators=(",", ":"))
+
+class AdviceCache:
+    """
+    LRU cache of advice text with a time-to-live, optionally backed by SQLite.
+
+    The SQLite file can be shared by several processes and survives restarts; entries
+    read from it are promoted into the in-memory LRU.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600, sqlite_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()  # key -> (stored_at, advice)
+        self._lock = threading.Lock()
+        self._db = None
+        if sqlite_path:
+            try:
+                self._db = sqlite3.connect(sqlite_path, check_same_thread=False, timeout=5)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS advice (key TEXT PRIMARY KEY, advice TEXT NOT NULL, stored_at REAL NOT NULL)"
+                )
+                if self.ttl is not None:
+                    self._db.execute("DELETE FROM advice WHERE stored_at < ?", (time.time() - self.ttl,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error opening advice cache {sqlite_path}: {e}")
+                self._db = None
+
+    def _expired(self, stored_at, now):
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def get(self, key):
+        """Return the cached advice for a key, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                del self._entries[key]
+            if self._db is None:
+                return None
+            try:
+                row = self._db.execute("SELECT stored_at, advice FROM advice WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"Error reading advice cache: {e}")
+                return None
+            if row is None or self._expired(row[0], now):
+                return None
+            self._store(key, row)
+            return row[1]
+
+    def put(self, key, advice):
+        now = time.time()
+        with self._lock:
+            self._store(key, (now, advice))
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO advice (key, advice, stored_at) VALUES (?, ?, ?)", (key, advice, now)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Error writing advice cache: {e}")
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -1,25 +1,116 @@
 # src/advisor.py
 import yaml
+import asyncio
+import json
 import logging
+import os
+import threading
 import time  # Added for time measurement
+from dataclasses import asdict, replace
 from src.model_loader import LLMModelLoader
-from src.baccarat_rules import calculate_hand_value, determine_winner
+from src.baccarat_rules import calculate_hand_value, banker_should_draw, card_to_str, card_value
 from src.baccarat_stats import calculate_win_probabilities
+from src.shoe import ShoeTracker
+from src.precompute import NextCardPrecomputer, hand_is_final, initial_cards_dealt
+from src.advice_cache import AdviceCache, canonical_key
+from src.scheduler import BatchInferenceScheduler
+from src.metrics import metrics, profile, RATE_BUCKETS, RATIO_BUCKETS
+from src.decision import (
+    StructuredAdvice,
+    compute_expected_values,
+    decide,
+    parse_decision,
+    render_explanation,
+)
+from src.structured import StructuredDecoding
+from src.utils import ADVICE_RECORDS_LOGGER
 
 logger = logging.getLogger(__name__)
+# JSON-lines advice records, enabled by setup_logging(advice_records_path=...)
+advice_records = logging.getLogger(ADVICE_RECORDS_LOGGER)
+
+# Static preamble shared by every request. It comes first so the model loader can
+# prefill it once and reuse its KV cache; only the suffix changes per request.
+PROMPT_PREFIX = """您是一位高度精准的百家乐专家，负责提供实时投注建议，系统已根据牌靴中剩余的牌，
+以百家乐的补牌规则，对目前的牌局之后所有可能的情况精确计算（或以大量随机模拟估算）出
+庄家、闲家与和局获胜的概率，放在此 prompt 里面。请考虑系统提供的概率，并考虑标准的百家乐投注赔率：
+
+- 玩家投注：1:1（平赔）
+- 庄家投注：1:1，赢时收取5%佣金
+- 和局投注：8:1
+
+请按照步骤详细思考，并于20秒以内回答，基于给定的期望值(应永远选择正期望值最大的选项。如都只有负值的情况下，选择不下注)，
+做出(1)投注玩家(2)投注庄家(3)投注和局(4)不下注
+其中之一的结论。
+=====
+Example:
+期望值(概率 * 赔率回报)：
+- 玩家投注：-0.1114
+- 庄家投注：-0.1315
+- 和局投注：-0.0073
+=> 因所有选项皆为负值，选择 (4) 不下注。
+=====
+
+用中文简要解释您的选择。开头第一句请先阐述下注结论。
+
+"""
+
+# Part of the advice cache key; bump whenever PROMPT_PREFIX or the suffix template changes
+PROMPT_VERSION = "2"
+
+# How the prompt describes the probabilities of each probability_method
+PROBABILITY_SOURCES = {
+    "exact": "按剩余牌精确计算",
+    "monte_carlo": "以大量随机模拟估算",
+    "adaptive": "以随机模拟估算至所需精度",
+}
 
 class BaccaratLLMAdvisor:
     def __init__(self, config_path):
         """Initialize the advisor with a config file."""
         self.config = self._load_config(config_path)
+        self.shoe_tracker = ShoeTracker(self.config.get("num_decks", 8))
         if self.config.get("enabled", True):
+            # The model is loaded on first use unless lazy_load is off or warm-up is requested
             self.model_loader = LLMModelLoader(
                 self.config["model_path"],
-                self.config.get("use_gpu", True)
+                self.config.get("use_gpu", True),
+                lazy=True,
+                quantization=self.config.get("quantization"),
+                quantized_model_path=self.config.get("quantized_model_path"),
+                draft_model_path=self.config.get("draft_model_path")
             )
+            self.model_loader.set_prompt_prefix(PROMPT_PREFIX, use_cache=self.config.get("prefix_cache", True))
+            if self.config.get("warmup", False):
+                self.model_loader.warmup()
+            elif not self.config.get("lazy_load", True):
+                self.model_loader.load()
         else:
             self.model_loader = None
 
+        self.scheduler = None
+        if self.config.get("batch_inference", False) and self.model_loader is not None:
+            self.scheduler = BatchInferenceScheduler(
+                self.model_loader,
+                max_batch_size=self.config.get("batch_max_size", 8),
+                batch_window_ms=self.config.get("batch_window_ms", 20),
+                generate_kwargs={"max_new_tokens": self.config.get("max_new_tokens", 150)}
+            )
+
+        self.precomputer = None
+        if self.config.get("precompute_next_cards", False):
+            self.precomputer = NextCardPrecomputer(
+                self._compute_state, max_tables=self.config.get("precompute_max_tables", 64)
+            )
+
+        self.advice_cache = None
+        if self.config.get("advice_cache", False):
+            self.advice_cache = AdviceCache(
+                max_entries=self.config.get("advice_cache_max_entries", 10000),
+                ttl_seconds=self.config.get("advice_cache_ttl_seconds", 3600),
+                sqlite_path=self.config.get("advice_cache_path")
+            )
+
     def _load_config(self, config_path):
         """Load configuration from a YAML file."""
         try:
@@ -29,10 +120,11 @@ class BaccaratLLMAdvisor:
             logger.error(f"Error loading config: {e}")
             return {}
 
-    def _create_prompt(self, game_state, probabilities):
-        player_hand = game_state['player_cards'].split('，')
+    def _create_prompt_suffix(self, game_state, probabilities):
+        """Build the per-request part of the prompt (cards, probabilities and EVs)."""
+        player_hand = game_state['player_hand']
         player_total = game_state['player_points']
-        banker_hand = game_state['banker_cards'].split('，')
+        banker_hand = game_state['banker_hand']
         banker_total = game_state['banker_points']
 
         # Check for natural wins (8 or 9 with two cards, no further draws)
@@ -57,159 +149,456 @@ class BaccaratLLMAdvisor:
                 else:
                     # If Player has 3 cards, check Banker’s draw based on Player’s third card
                     if len(player_hand) == 3 and len(banker_hand) == 2:
-                        player_third_card_value = self._get_card_value(player_hand[-1].split()[0])
-                        if self._should_banker_draw(banker_total, player_third_card_value):
+                        if banker_should_draw(banker_total, card_value(player_hand[-1])):
                             third_card_info += "，庄家将抽第三张牌"  # Banker will draw a third card
                         else:
                             third_card_info += "，庄家停止抽牌"  # Banker stops
                     else:
                         third_card_info += "，庄家停止抽牌"  # Banker stops
 
-        prob_player = probabilities['player'] / 100
-        prob_banker = probabilities['banker'] / 100
-        prob_tie = probabilities['tie'] / 100
-
-        EV_player = prob_player * 1 + (prob_banker + prob_tie) * (-1)
-        EV_banker = prob_banker * 0.95 + (prob_player + prob_tie) * (-1)
-        EV_tie = prob_tie * 8 + (prob_player + prob_banker) * (-1)
-
-        prompt = f"""您是一位高度精准的百家乐专家，负责提供实时投注建议，系统已对目前的牌局之后可能的情况，
-        按照随机抽牌，以百家乐的规则进行千局模拟，将之后庄家或闲家赢的分布图之概率算出来后，
-        放在此 prompt 里面。请考虑系统提供的概率，并考虑标准的百家乐投注赔率：
-
-        - 玩家投注：1:1（平赔）
-        - 庄家投注：1:1，赢时收取5%佣金
-        - 和局投注：8:1
-
-        当前状态：
-        玩家牌：{game_state['player_cards']}（总计 {game_state['player_points']} 点）
-        庄家牌：{game_state['banker_cards']}（总计 {game_state['banker_points']} 点）
-        游戏当前状态：{third_card_info}
-
-        获胜概率(以千局模拟后的概率)：
-        - 玩家：{probabilities['player']:.2f}%
-        - 庄家：{probabilities['banker']:.2f}%
-        - 和局：{probabilities['tie']:.2f}%
-
-        期望值(概率 * 赔率回报)：
-        - 玩家投注：{EV_player:.4f}
-        - 庄家投注：{EV_banker:.4f}
-        - 和局投注：{EV_tie:.4f}
-
-        请按照步骤详细思考，并于20秒以内回答，基于给定的期望值(应永远选择正期望值最大的选项。如都只有负值的情况下，选择不下注)，
-        做出(1)投注玩家(2)投注庄家(3)投注和局(4)不下注
-        其中之一的结论。
-        =====
-        Example:
-        期望值(概率 * 赔率回报)：
-        - 玩家投注：-0.1114
-        - 庄家投注：-0.1315
-        - 和局投注：-0.0073
-        => 因所有选项皆为负值，选择 (4) 不下注。
-        =====
-
-        用中文简要解释您的选择。开头第一句请先阐述下注结论。
-        您的建议："""
-        return prompt
-
-    # Helper method to extract card value for _should_banker_draw
-    def _get_card_value(self, card_str):
-        """Extract the numerical value of a card from its string description."""
-        value_map = {'A': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 0, 'J': 0, 'Q': 0, 'K': 0}
-        return str(value_map.get(card_str, 0))
+        expected_values = compute_expected_values(probabilities)
 
-    def _format_cards_for_prompt(self, resultlist):
-        """Format card results into a game state dictionary."""
-        player_cards = []
-        banker_cards = []
+        return f"""当前状态：
+玩家牌：{self._render_cards(player_hand)}（总计 {player_total} 点）
+庄家牌：{self._render_cards(banker_hand)}（总计 {banker_total} 点）
+游戏当前状态：{third_card_info}
 
-        for card in resultlist:
-            card_desc = self._get_card_description(card.classid)
-            if card.index in [1, 3, 5]:  # Player positions
-                player_cards.append(card_desc)
-            elif card.index in [2, 4, 6]:  # Banker positions
-                banker_cards.append(card_desc)
+获胜概率({PROBABILITY_SOURCES.get(self.config.get("probability_method", "exact"), "计算所得")})：
+- 玩家：{probabilities['player']:.2f}%
+- 庄家：{probabilities['banker']:.2f}%
+- 和局：{probabilities['tie']:.2f}%
+
+期望值(概率 * 赔率回报)：
+- 玩家投注：{expected_values['player']:.4f}
+- 庄家投注：{expected_values['banker']:.4f}
+- 和局投注：{expected_values['tie']:.4f}
+
+您的建议："""
+
+    def _create_prompt(self, game_state, probabilities):
+        """Build the full prompt: the static preamble followed by the per-request state."""
+        return PROMPT_PREFIX + self._create_prompt_suffix(game_state, probabilities)
 
-        player_points = calculate_hand_value(player_cards)
-        banker_points = calculate_hand_value(banker_cards)
+    def _format_cards_for_prompt(self, resultlist):
+        """Split card results into a game state dictionary of int cards and totals."""
+        player_hand = []
+        banker_hand = []
 
-        player_text = "，".join(player_cards) if player_cards else "无牌"
-        banker_text = "，".join(banker_cards) if banker_cards else "无牌"
+        for card in resultlist:
+            if card.index in (1, 3, 5):  # Player positions
+                player_hand.append(card.classid)
+            elif card.index in (2, 4, 6):  # Banker positions
+                banker_hand.append(card.classid)
 
         return {
-            "player_cards": player_text,
-            "player_points": player_points,
-            "banker_cards": banker_text,
-            "banker_points": banker_points
+            "player_hand": player_hand,
+            "player_points": calculate_hand_value(player_hand),
+            "banker_hand": banker_hand,
+            "banker_points": calculate_hand_value(banker_hand)
         }
 
-    def _get_card_description(self, classid):
-        """Convert classid to human-readable card description."""
-        suits = ["Spade", "Heart", "Diamond", "Club"]
-        values = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K"]
-        suit_idx = (classid - 1) // 13
-        value_idx = (classid - 1) % 13
-        return f"{values[value_idx]} {suits[suit_idx]}"
+    def _render_cards(self, hand):
+        """Render int cards as prompt text, e.g. 'A Spade，5 Heart'."""
+        return "，".join(card_to_str(card) for card in hand) if hand else "无牌"
 
     def _get_fallback_advice(self, resultlist):
         """Return fallback advice if the model is unavailable."""
         return "由于模型未加载，建议根据历史趋势投注。"
 
-    def _should_banker_draw(self, banker_total, player_third_card):
-        """Determine if Banker should draw a third card based on Baccarat rules."""
-        if banker_total <= 2:
-            return True
-        if banker_total == 3 and player_third_card != '8':
-            return True
-        if banker_total == 4 and 2 <= int(player_third_card) <= 7:
-            return True
-        if banker_total == 5 and 4 <= int(player_third_card) <= 7:
-            return True
-        if banker_total == 6 and player_third_card in ['6', '7']:
-            return True
-        return False
+    def export_metrics(self):
+        """Write the metrics to the files named by metrics_prometheus_path / metrics_json_path."""
+        if self.config.get("metrics_prometheus_path"):
+            metrics.write_prometheus(self.config["metrics_prometheus_path"])
+        if self.config.get("metrics_json_path"):
+            metrics.write_json(self.config["metrics_json_path"])
 
-    def get_advice(self, gmcode, resultlist):
-        """Generate advice using the loaded model or return fallback."""
-        if not self.config.get("enabled", True) or \
-           self.model_loader is None or \
-           self.model_loader.model is None:
-            return self._get_fallback_advice(resultlist)
+    def new_shoe(self, gmcode):
+        """Reset the tracked shoe composition of a table when a new shoe starts."""
+        self.shoe_tracker.new_shoe(gmcode)
+
+    def _use_llm(self, resultlist):
+        """
+        Decide whether a request needs the LLM, per the `llm_mode` config:
+        "always" (default), "never", or "auto" (only while the hand is not final).
 
+        "Final" is read from the cards, not the probabilities: hands with fewer than two
+        cards per side also get 100/0/0 probabilities, but nothing is decided yet.
+        """
+        llm_mode = self.config.get("llm_mode", "always")
+        if llm_mode == "never":
+            return False
+        if llm_mode == "auto":
+            return not hand_is_final(resultlist)
+        return True
+
+    def _model_available(self):
+        return self.config.get("enabled", True) and \
+            self.model_loader is not None and \
+            self.model_loader.model is not None
+
+    def _metric_labels(self, gmcode):
+        """Labels attached to every metric of a request."""
+        model_path = self.config.get("model_path")
+        model = os.path.basename(os.path.normpath(model_path)) if model_path else "none"
+        return {"gmcode": gmcode, "model": model}
+
+    def _advice_cache_key(self, resultlist, deck):
+        """Canonical cache key of a request: card ranks, totals, shoe bucket and everything shaping the advice."""
         game_state = self._format_cards_for_prompt(resultlist)
-        # Placeholder for remaining deck (empty for now; enhance as needed)
-        deck = []
-
-        # Start timing the probability simulation
-        sim_start_time = time.time()
-        logger.info("Starting 1000-game simulation for probabilities")
-        probabilities = calculate_win_probabilities(
-            game_state['player_cards'].split('，'),
-            game_state['banker_cards'].split('，'),
-            deck
+        context = (
+            self.config.get("model_path"),
+            self.config.get("quantization"),
+            self.config.get("draft_model_path"),
+            PROMPT_VERSION,
+            self.config.get("probability_method", "exact"),
+            self.config.get("llm_mode", "always"),
+            self.config.get("max_new_tokens", 150),
+            self.config.get("structured_output", False),
         )
-        sim_elapsed_time = time.time() - sim_start_time
-        logger.info(f"1000-game simulation completed in {sim_elapsed_time:.2f} seconds")
+        return canonical_key(game_state['player_hand'], game_state['banker_hand'], deck,
+                             self.config.get("advice_cache_shoe_bucket", 8), context)
 
-        prompt = self._create_prompt(game_state, probabilities)
-        
-        try:
-            # Start timing the LLM processing
-            llm_start_time = time.time()
-            
-            logger.info("Starting LLM prompt processing")
-            inputs = self.model_loader.tokenizer(prompt, return_tensors="pt").to(self.model_loader.device)
-            output_ids = self.model_loader.model.generate(
-                **inputs,
-                max_new_tokens=self.config.get("max_new_tokens", 150)
-            )
-            advice = self.model_loader.tokenizer.decode(output_ids[0], skip_special_tokens=True)
-            
-            # Calculate and log elapsed time for LLM
-            llm_elapsed_time = time.time() - llm_start_time
-            logger.info(f"LLM prompt processing completed in {llm_elapsed_time:.2f} seconds")
-            
+    def _calculate_probabilities(self, game_state, deck):
+        """Win probabilities of a game state with the configured method."""
+        method = self.config.get("probability_method", "exact")
+        options = {}
+        if method == "adaptive":
+            num_simulations = self.config.get("adaptive_max_simulations", 200000)
+            options = {
+                "tolerance": self.config.get("adaptive_tolerance", 0.5),
+                "confidence": self.config.get("adaptive_confidence", 0.95),
+                "chunk_size": self.config.get("adaptive_chunk_size", 5000),
+                "workers": self.config.get("adaptive_workers", 0),
+            }
+        else:
+            num_simulations = self.config.get("num_simulations", 10000)
+        return calculate_win_probabilities(
+            game_state['player_hand'],
+            game_state['banker_hand'],
+            deck,
+            method=method,
+            num_simulations=num_simulations,
+            seed=self.config.get("random_seed"),
+            **options
+        )
+
+    def _compute_state(self, resultlist, deck):
+        """Everything get_advice derives from the cards before generation; used for precomputation."""
+        game_state = self._format_cards_for_prompt(resultlist)
+        probabilities = self._calculate_probabilities(game_state, deck)
+        expected_values = compute_expected_values(probabilities)
+        return {
+            "game_state": game_state,
+            "probabilities": probabilities,
+            "expected_values": expected_values,
+            "prompt_suffix": self._create_prompt_suffix(game_state, probabilities),
+            # Only deterministic when the outcome is already certain
+            "decision": decide(expected_values) if hand_is_final(resultlist) else None,
+        }
+
+    def _prepare_prompt(self, resultlist, deck, labels=None, gmcode=None):
+        """
+        Compute the game state, win probabilities and per-request prompt suffix.
+
+        With precompute_next_cards, a state precomputed for this table is returned
+        without recomputation, and the next card's states are scheduled.
+        """
+        labels = labels or {}
+        if self.precomputer is not None and gmcode is not None:
+            precomputed = self.precomputer.lookup(gmcode, resultlist, deck)
+            self.precomputer.schedule(gmcode, resultlist, deck)
+            result = "hit" if precomputed else "miss"
+            metrics.inc("advisor_precompute_total", help_text="Precomputed state lookups", result=result, **labels)
+            if precomputed:
+                return precomputed["game_state"], precomputed["probabilities"], precomputed["prompt_suffix"]
+
+        with metrics.time_stage("format_cards", **labels):
+            game_state = self._format_cards_for_prompt(resultlist)
+
+        with metrics.time_stage("probabilities", **labels):
+            probabilities = self._calculate_probabilities(game_state, deck)
+
+        with metrics.time_stage("build_prompt", **labels):
+            prompt_suffix = self._create_prompt_suffix(game_state, probabilities)
+        return game_state, probabilities, prompt_suffix
+
+    def get_advice(self, gmcode, resultlist):
+        """
+        Generate advice using the loaded model or return fallback.
+
+        Returns the advice text, or a StructuredAdvice (decision, probabilities, EVs
+        and text) when `structured_output` is enabled.
+        """
+        start_time = time.perf_counter()
+        profiler = self.config.get("profile")
+        if not profiler:
+            advice = self._get_advice(gmcode, resultlist)
+        else:
+            profile_dir = self.config.get("profile_dir", "logs/profiles")
+            extension = "prof" if profiler == "cprofile" else "json"
+            output_path = os.path.join(profile_dir, f"{gmcode}_{time.strftime('%Y%m%d_%H%M%S')}_{time.time_ns() % 10**9}.{extension}")
+            with profile(profiler, output_path):
+                advice = self._get_advice(gmcode, resultlist)
+        if advice_records.isEnabledFor(logging.INFO):
+            advice_records.info("advice", extra={"advice": {
+                "gmcode": gmcode,
+                "cards": [[card.index, card.classid] for card in resultlist],
+                "latency_ms": round((time.perf_counter() - start_time) * 1000, 3),
+                **asdict(advice),
+            }})
+        return advice if self.config.get("structured_output", False) else advice.text
+
+    def _fallback(self, resultlist, probabilities=None):
+        expected_values = compute_expected_values(probabilities) if probabilities else None
+        return StructuredAdvice(None, probabilities, expected_values, self._get_fallback_advice(resultlist), "fallback")
+
+    def _get_advice(self, gmcode, resultlist):
+        labels = self._metric_labels(gmcode)
+        with metrics.time_stage("total", **labels):
+            # Keep the shoe composition current even when falling back
+            deck = self.shoe_tracker.observe(gmcode, resultlist)
+
+            if self.config.get("llm_mode", "always") == "always" and not self._model_available():
+                metrics.inc("advisor_requests_total", help_text="get_advice requests by path", path="fallback", **labels)
+                return self._fallback(resultlist)
+
+            cache_key = None
+            if self.advice_cache is not None:
+                with metrics.time_stage("cache_lookup", **labels):
+                    cache_key = self._advice_cache_key(resultlist, deck)
+                    cached = self._cached_advice(cache_key)
+                if cached is not None:
+                    metrics.inc("advisor_requests_total", help_text="get_advice requests by path", path="cache", **labels)
+                    return self._render_advice(cached, self._format_cards_for_prompt(resultlist))
+
+            game_state, probabilities, prompt_suffix = self._prepare_prompt(resultlist, deck, labels, gmcode)
+            expected_values = compute_expected_values(probabilities)
+            if not self._use_llm(resultlist):
+                if not initial_cards_dealt(resultlist):
+                    # Rule-based advice needs two cards per side
+                    metrics.inc("advisor_requests_total", help_text="get_advice requests by path", path="fallback", **labels)
+                    return self._fallback(resultlist)
+                logger.info("Outcome decided by rules; skipping LLM generation")
+                metrics.inc("advisor_requests_total", help_text="get_advice requests by path", path="rules", **labels)
+                with metrics.time_stage("rules", **labels):
+                    decision = decide(expected_values)
+                    advice = StructuredAdvice(
+                        decision, probabilities, expected_values,
+                        render_explanation(decision, probabilities, expected_values, hand_is_final(resultlist)), "rules"
+                    )
+                self._cache_advice(cache_key, advice)
+                return advice
+            if not self._model_available():
+                metrics.inc("advisor_requests_total", help_text="get_advice requests by path", path="fallback", **labels)
+                return self._fallback(resultlist, probabilities)
+
+            structured = self.config.get("structured_output", False)
+            try:
+                # Start timing the LLM processing
+                llm_start_time = time.time()
+
+                logger.info("Starting LLM prompt processing")
+                if self.scheduler is not None and not structured:
+                    # Concurrent tables share one batched generate call
+                    with metrics.time_stage("batched_generate", **labels):
+                        text = self.scheduler.submit(prompt_suffix).result()
+                else:
+                    timings = {}
+                    output_ids = self.model_loader.generate(prompt_suffix, timings=timings, **self._generate_kwargs())
+                    with metrics.time_stage("detokenize", **labels):
+                        if structured:
+                            # Only the generated tokens: the decision code and its explanation
+                            prompt_length = output_ids.shape[1] - timings["generated_tokens"]
+                            text = self.model_loader.tokenizer.decode(output_ids[0, prompt_length:], skip_special_tokens=True).strip()
+                        else:
+                            text = self.model_loader.tokenizer.decode(output_ids[0], skip_special_tokens=True)
+                    self._record_generation(timings, labels)
+
+                # Calculate and log elapsed time for LLM
+                llm_elapsed_time = time.time() - llm_start_time
+                logger.info(f"LLM prompt processing completed in {llm_elapsed_time:.2f} seconds")
+                metrics.inc("advisor_requests_total", help_text="get_advice requests by path", path="llm", **labels)
+
+                # Free-text advice repeats the prompt, whose instructions name every option
+                reply = (text if structured else text.rsplit("您的建议：", 1)[-1]).strip()
+                advice = StructuredAdvice(parse_decision(reply), probabilities, expected_values, reply, "llm")
+                self._cache_advice(cache_key, advice)
+                return self._render_advice(advice, game_state)
+            except Exception as e:
+                logger.error(f"Error generating advice: {e}")
+                metrics.inc("advisor_requests_total", help_text="get_advice requests by path", path="error", **labels)
+                return self._fallback(resultlist, probabilities)
+
+    def _generate_kwargs(self):
+        """generate() arguments of one request; structured_output constrains the decision and explanation."""
+        if not self.config.get("structured_output", False):
+            return {"max_new_tokens": self.config.get("max_new_tokens", 150)}
+        return StructuredDecoding(
+            self.model_loader.tokenizer,
+            max_explanation_tokens=self.config.get("structured_max_explanation_tokens", 48),
+            stop_strings=self.config.get("structured_stop_strings", ["\n"])
+        ).generate_kwargs()
+
+    def _render_advice(self, advice, game_state):
+        """
+        Shape advice for get_advice. LLM advice holds only the model's reply (the form
+        cached and streamed); free-text output returns it after the prompt of `game_state`.
+        """
+        if advice.source != "llm" or self.config.get("structured_output", False):
             return advice
-        except Exception as e:
-            logger.error(f"Error generating advice: {e}")
-            return self._get_fallback_advice(resultlist)
\ No newline at end of file
+        return replace(advice, text=self._create_prompt(game_state, advice.probabilities) + advice.text)
+
+    def _cached_advice(self, cache_key):
+        cached = self.advice_cache.get(cache_key)
+        if cached is None:
+            return None
+        try:
+            return StructuredAdvice(**json.loads(cached))
+        except (TypeError, ValueError):
+            return None
+
+    def _cache_advice(self, cache_key, advice):
+        if cache_key is not None:
+            self.advice_cache.put(cache_key, json.dumps(asdict(advice), ensure_ascii=False))
+
+    def _record_generation(self, timings, labels):
+        """Record tokenize/prefill/decode stages and decode throughput from generate() timings."""
+        for stage in ("tokenize", "prefill", "decode"):
+            metrics.observe_stage(stage, timings[stage], **labels)
+        generated_tokens = timings["generated_tokens"]
+        metrics.inc("advisor_generated_tokens_total", generated_tokens, help_text="Tokens generated by the LLM", **labels)
+        metrics.observe("advisor_generated_tokens", generated_tokens, buckets=RATE_BUCKETS,
+                        help_text="Tokens generated per request", **labels)
+        # The first token is produced by the prefill pass
+        if generated_tokens > 1 and timings["decode"] > 0:
+            metrics.observe("advisor_decode_tokens_per_second", (generated_tokens - 1) / timings["decode"],
+                            buckets=RATE_BUCKETS, help_text="Decode throughput after the first token", **labels)
+        if timings.get("acceptance_rate") is not None:
+            metrics.inc("advisor_draft_tokens_total", timings["draft_tokens"],
+                        help_text="Tokens proposed by the draft model", **labels)
+            metrics.inc("advisor_draft_accepted_tokens_total", timings["accepted_tokens"],
+                        help_text="Draft tokens accepted by the main model", **labels)
+            metrics.observe("advisor_draft_acceptance_rate", timings["acceptance_rate"], buckets=RATIO_BUCKETS,
+                            help_text="Share of draft tokens accepted per request", **labels)
+
+    def get_advice_stream(self, gmcode, resultlist, timings=None):
+        """
+        Yield the generated advice text chunk by chunk as it is decoded.
+
+        With `structured_output`, generation is constrained as in get_advice: a
+        decision code first, then a short explanation.
+
+        Args:
+            gmcode (str): Table code.
+            resultlist (list): Cards dealt so far in the current hand.
+            timings (dict, optional): Filled with 'time_to_first_token',
+                'time_to_decision' and 'total_time' (seconds, None if not reached)
+                and the parsed 'decision'.
+        """
+        timings = {} if timings is None else timings
+        timings.update(time_to_first_token=None, time_to_decision=None, total_time=None, decision=None)
+        start_time = time.time()
+        labels = self._metric_labels(gmcode)
+        deck = self.shoe_tracker.observe(gmcode, resultlist)
+
+        if self.config.get("llm_mode", "always") == "always" and not self._model_available():
+            yield self._get_fallback_advice(resultlist)
+            timings["total_time"] = time.time() - start_time
+            return
+
+        cache_key = None
+        if self.advice_cache is not None:
+            cache_key = self._advice_cache_key(resultlist, deck)
+            cached = self._cached_advice(cache_key)
+            if cached is not None:
+                timings["total_time"] = timings["time_to_first_token"] = timings["time_to_decision"] = time.time() - start_time
+                timings["decision"] = cached.decision
+                yield cached.text
+                return
+
+        _, probabilities, prompt_suffix = self._prepare_prompt(resultlist, deck, labels, gmcode)
+        expected_values = compute_expected_values(probabilities)
+        if not self._use_llm(resultlist):
+            if not initial_cards_dealt(resultlist):
+                yield self._get_fallback_advice(resultlist)
+                timings["total_time"] = time.time() - start_time
+                return
+            decision = decide(expected_values)
+            advice = render_explanation(decision, probabilities, expected_values, hand_is_final(resultlist))
+            self._cache_advice(cache_key, StructuredAdvice(decision, probabilities, expected_values, advice, "rules"))
+            timings["total_time"] = timings["time_to_first_token"] = timings["time_to_decision"] = time.time() - start_time
+            timings["decision"] = decision
+            yield advice
+            return
+        if not self._model_available():
+            yield self._get_fallback_advice(resultlist)
+            timings["total_time"] = time.time() - start_time
+            return
+        from transformers import TextIteratorStreamer
+
+        streamer = TextIteratorStreamer(self.model_loader.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors = []
+
+        def run_generate():
+            try:
+                self.model_loader.generate(prompt_suffix, streamer=streamer, **self._generate_kwargs())
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        logger.info("Starting streamed LLM generation")
+        thread = threading.Thread(target=run_generate, daemon=True)
+        thread.start()
+        text = ""
+        for chunk in streamer:
+            if not chunk:
+                continue
+            if timings["time_to_first_token"] is None:
+                timings["time_to_first_token"] = time.time() - start_time
+            text += chunk
+            if timings["decision"] is None:
+                timings["decision"] = parse_decision(text)
+                if timings["decision"] is not None:
+                    timings["time_to_decision"] = time.time() - start_time
+            yield chunk
+        thread.join()
+        timings["total_time"] = time.time() - start_time
+
+        if errors:
+            logger.error(f"Error generating advice: {errors[0]}")
+            if not text:
+                yield self._get_fallback_advice(resultlist)
+            return
+        self._cache_advice(cache_key, StructuredAdvice(timings["decision"], probabilities, expected_values, text.strip(), "llm"))
+        ttft = timings["time_to_first_token"]
+        ttd = timings["time_to_decision"]
+        for stage, key in (("stream_first_token", "time_to_first_token"), ("stream_decision", "time_to_decision"),
+                           ("stream_total", "total_time")):
+            if timings[key] is not None:
+                metrics.observe_stage(stage, timings[key], **labels)
+        logger.info(
+            f"Streamed generation completed in {timings['total_time']:.2f} seconds "
+            f"(first token: {ttft if ttft is None else round(ttft, 2)}s, "
+            f"decision: {ttd if ttd is None else round(ttd, 2)}s)"
+        )
+
+    async def get_advice_stream_async(self, gmcode, resultlist, timings=None):
+        """Async variant of get_advice_stream; generation runs in a worker thread."""
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for chunk in self.get_advice_stream(gmcode, resultlist, timings):
+                    loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+            finally:
+                loop.call_soon_threadsafe(chunks.put_nowait, done)
+
+        producer = loop.run_in_executor(None, produce)
+        while True:
+            chunk = await chunks.get()
+            if chunk is done:
+                break
+            yield chunk
+        await producer
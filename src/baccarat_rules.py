@@ -1,9 +1,29 @@
 # src/baccarat_rules.py
-card_values = {'A': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 0, 'J': 0, 'Q': 0, 'K': 0}
+# Cards are plain ints: the detector's classid, 1-52, ordered by suit then rank
+# (1 = A Spade, 13 = K Spade, 14 = A Heart, ... 52 = K Club).
+NUM_RANKS = 13
+RANK_NAMES = ('A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K')
+SUIT_NAMES = ('Spade', 'Heart', 'Diamond', 'Club')
+# Point value of each rank index (A, 2-9, 10, J, Q, K)
+RANK_POINTS = (1, 2, 3, 4, 5, 6, 7, 8, 9, 0, 0, 0, 0)
+# Point value of each card (index 0 is unused)
+CARD_POINTS = (0,) + tuple(RANK_POINTS[(card - 1) % NUM_RANKS] for card in range(1, 53))
+
+def card_rank(card):
+    """Rank index of a card (0 = A ... 12 = K)."""
+    return (card - 1) % NUM_RANKS
+
+def card_value(card):
+    """Baccarat point value of a card."""
+    return CARD_POINTS[card]
+
+def card_to_str(card):
+    """Human-readable card description, e.g. 'A Spade'. Only used when rendering text."""
+    return f"{RANK_NAMES[(card - 1) % NUM_RANKS]} {SUIT_NAMES[(card - 1) // NUM_RANKS]}"
 
 def calculate_hand_value(cards):
     """Calculate hand value modulo 10."""
-    return sum(card_values[card.split()[0]] for card in cards) % 10
+    return sum(CARD_POINTS[card] for card in cards) % 10
 
 def determine_winner(player_hand, banker_hand):
     """Decide the winner based on final hand values."""
@@ -14,4 +34,31 @@ def determine_winner(player_hand, banker_hand):
     elif banker_value > player_value:
         return 'banker'
     else:
-        return 'tie'
\ No newline at end of file
+        return 'tie'
+
+def player_should_draw(player_total):
+    """Player draws a third card on a two-card total of 0-5."""
+    return player_total <= 5
+
+def banker_should_draw(banker_total, player_third_value=None):
+    """
+    Decide whether Banker draws a third card.
+
+    Args:
+        banker_total (int): Banker's two-card total.
+        player_third_value (int or None): Point value of Player's third card,
+            or None if Player stood on two cards.
+    """
+    if player_third_value is None:
+        return banker_total <= 5
+    if banker_total <= 2:
+        return True
+    if banker_total == 3:
+        return player_third_value != 8
+    if banker_total == 4:
+        return 2 <= player_third_value <= 7
+    if banker_total == 5:
+        return 4 <= player_third_value <= 7
+    if banker_total == 6:
+        return player_third_value in (6, 7)
+    return False
@@ -1,16 +1,39 @@
 # src/baccarat_stats.py
+import statistics
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from src.baccarat_rules import calculate_hand_value, determine_winner, card_values as card_points
+from src.baccarat_rules import (
+    calculate_hand_value,
+    determine_winner,
+    player_should_draw,
+    banker_should_draw,
+    CARD_POINTS,
+    NUM_RANKS,
+    RANK_POINTS,
+)
+from src.shoe import ShoeState
 
-def calculate_win_probabilities(player_hand, banker_hand, deck):
+def calculate_win_probabilities(player_hand, banker_hand, deck, method="exact", num_simulations=10000, seed=None,
+                                **adaptive_options):
     """
-    Estimate win probabilities for Player, Banker, and Tie based on current hands.
-    
+    Compute win probabilities for Player, Banker, and Tie based on current hands.
+
     Args:
-        player_hand (list): List of card descriptions (e.g., ['A Spade', '5 Heart']).
-        banker_hand (list): List of card descriptions for Banker.
-        deck (list): Remaining cards in the deck (simplified as empty for now).
-    
+        player_hand (list): List of int cards (classids, e.g. [1, 18] for A Spade, 5 Heart).
+        banker_hand (list): List of int cards for Banker.
+        deck (ShoeState or list): Remaining shoe composition (with the cards on the
+            table already removed), or a list of remaining int cards. When
+            empty, a fresh 52-card deck minus the cards already on the table is assumed.
+        method (str): "exact" enumerates every third-card draw weighted by its
+            probability; "monte_carlo" samples `num_simulations` random games;
+            "adaptive" samples in chunks until the estimates are precise enough
+            (see adaptive_monte_carlo).
+        num_simulations (int): Number of games to sample for "monte_carlo", and the
+            upper bound for "adaptive".
+        seed (int, optional): Seed for the sampling methods, so runs can be replayed.
+        **adaptive_options: tolerance, confidence, chunk_size, chunks_per_round and
+            workers for "adaptive".
+
     Returns:
         dict: Probabilities for 'player', 'banker', and 'tie' in percentages.
     """
@@ -18,8 +41,10 @@ def calculate_win_probabilities(player_hand, banker_hand, deck):
     player_total = calculate_hand_value(player_hand)
     banker_total = calculate_hand_value(banker_hand)
 
-    # Check for natural 8 or 9 (no third cards drawn)
-    if player_total >= 8 or banker_total >= 8:
+    # Natural 8 or 9 on the first two cards (no third cards drawn), or both hands already complete.
+    # A third card totalling 8 or 9 is not a natural: Banker may still draw.
+    natural = (len(player_hand) == 2 and player_total >= 8) or (len(banker_hand) == 2 and banker_total >= 8)
+    if natural or (len(player_hand) == 3 and len(banker_hand) == 3):
         winner = determine_winner(player_hand, banker_hand)
         return {
             'player': 100.0 if winner == 'player' else 0.0,
@@ -27,66 +52,109 @@ def calculate_win_probabilities(player_hand, banker_hand, deck):
             'tie': 100.0 if winner == 'tie' else 0.0
         }
 
-    # If hands already have 3 cards, no further draws
-    if len(player_hand) == 3 and len(banker_hand) == 3:
-        winner = determine_winner(player_hand, banker_hand)
-        return {
-            'player': 100.0 if winner == 'player' else 0.0,
-            'banker': 100.0 if winner == 'banker' else 0.0,
-            'tie': 100.0 if winner == 'tie' else 0.0
-        }
+    if method == "exact":
+        return _exact_probabilities(player_hand, banker_hand, _value_counts(player_hand, banker_hand, deck))
+    if method == "monte_carlo":
+        return _monte_carlo_probabilities(
+            player_hand, banker_hand, _card_list(player_hand, banker_hand, deck), num_simulations, seed
+        )
+    if method == "adaptive":
+        probabilities, _ = adaptive_monte_carlo(
+            player_hand, banker_hand, deck, max_simulations=num_simulations, seed=seed, **adaptive_options
+        )
+        return probabilities
+    raise ValueError(f"Unknown probability method: {method}")
 
-    # Simulate third-card draws (initially 2 cards each)
-    outcomes = {'player': 0, 'banker': 0, 'tie': 0}
-    total_simulations = 10000  # Increased for better accuracy
+def _fresh_deck(used_cards):
+    """Build a single 52-card deck without the cards already dealt."""
+    used_cards = set(used_cards)
+    return [card for card in range(1, 53) if card not in used_cards]
+
+def _value_counts(player_hand, banker_hand, deck):
+    """Count the remaining cards per point value (10/J/Q/K all count as 0)."""
+    if isinstance(deck, ShoeState):
+        return deck.value_counts()
+    counts = [0] * 10
+    for card in deck or _fresh_deck(player_hand + banker_hand):
+        counts[CARD_POINTS[card]] += 1
+    return counts
+
+def _card_list(player_hand, banker_hand, deck):
+    """Expand the remaining deck into int cards for sampling."""
+    if isinstance(deck, ShoeState):
+        # Suits never affect the outcome, so one suit per rank is enough
+        return [rank + 1 for rank in range(NUM_RANKS) for _ in range(deck.counts[rank])]
+    return list(deck) if deck else _fresh_deck(player_hand + banker_hand)
+
+def _rank_counts(player_hand, banker_hand, deck):
+    """Count the remaining cards per rank (A..K)."""
+    if isinstance(deck, ShoeState):
+        return list(deck.counts)
+    counts = [0] * NUM_RANKS
+    for card in deck or _fresh_deck(player_hand + banker_hand):
+        counts[(card - 1) % NUM_RANKS] += 1
+    return counts
+
+def _exact_probabilities(player_hand, banker_hand, counts):
+    """Enumerate the remaining third-card draws by point value and weight each by its probability."""
+    counts = list(counts)
+    remaining = sum(counts)
+
+    player_total = calculate_hand_value(player_hand)
+    banker_total = calculate_hand_value(banker_hand)
+    outcomes = {'player': 0.0, 'banker': 0.0, 'tie': 0.0}
 
-    # Simplified deck: 13 values (A, 2-10, J, Q, K), 4 suits each, excluding used cards
-    card_names = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
-    suits = ['Spade', 'Heart', 'Diamond', 'Club']
-    all_cards = [f"{value} {suit}" for value in card_names for suit in suits]
-    used_cards = set(player_hand + banker_hand)
-    remaining_deck = [card for card in all_cards if card not in used_cards]
+    def settle(player_final, banker_final, weight):
+        if player_final > banker_final:
+            outcomes['player'] += weight
+        elif banker_final > player_final:
+            outcomes['banker'] += weight
+        else:
+            outcomes['tie'] += weight
 
-    for _ in range(total_simulations):
+    def banker_turn(player_final, player_third_value, weight, cards_left):
+        if len(banker_hand) == 2 and banker_should_draw(banker_total, player_third_value):
+            for value in range(10):
+                if counts[value]:
+                    settle(player_final, (banker_total + value) % 10, weight * counts[value] / cards_left)
+        else:
+            settle(player_final, banker_total, weight)
+
+    if len(player_hand) == 2 and player_should_draw(player_total):
+        for value in range(10):
+            if not counts[value]:
+                continue
+            weight = counts[value] / remaining
+            counts[value] -= 1
+            banker_turn((player_total + value) % 10, value, weight, remaining - 1)
+            counts[value] += 1
+    else:
+        player_third_value = CARD_POINTS[player_hand[2]] if len(player_hand) == 3 else None
+        banker_turn(player_total, player_third_value, 1.0, remaining)
+
+    return {k: v * 100 for k, v in outcomes.items()}
+
+def _monte_carlo_probabilities(player_hand, banker_hand, remaining_deck, num_simulations, seed=None):
+    """Estimate probabilities by simulating random third-card draws."""
+    rng = np.random.default_rng(seed)
+    player_total = calculate_hand_value(player_hand)
+    banker_total = calculate_hand_value(banker_hand)
+    outcomes = {'player': 0, 'banker': 0, 'tie': 0}
+
+    for _ in range(num_simulations):
         sim_player = player_hand.copy()
         sim_banker = banker_hand.copy()
-        sim_remaining_deck = remaining_deck.copy()  # Each simulation has its own deck
+        sim_remaining_deck = list(remaining_deck)  # Each simulation has its own deck
 
         # Player's third card rule
-        if len(sim_player) == 2 and player_total <= 5:
-            player_third_card = np.random.choice(sim_remaining_deck)
-            sim_player.append(player_third_card)
-            sim_remaining_deck.remove(player_third_card)
+        if len(sim_player) == 2 and player_should_draw(player_total):
+            sim_player.append(sim_remaining_deck.pop(rng.integers(len(sim_remaining_deck))))
 
         # Banker's third card rule
         if len(sim_banker) == 2:
-            if len(sim_player) == 2:  # Player stood (total 6-7)
-                if banker_total <= 5:
-                    banker_third_card = np.random.choice(sim_remaining_deck)
-                    sim_banker.append(banker_third_card)
-                    sim_remaining_deck.remove(banker_third_card)
-            else:  # Player drew a third card
-                player_third_value = card_points[sim_player[2].split()[0]]
-                if banker_total <= 2:
-                    banker_third_card = np.random.choice(sim_remaining_deck)
-                    sim_banker.append(banker_third_card)
-                    sim_remaining_deck.remove(banker_third_card)
-                elif banker_total == 3 and player_third_value != 8:
-                    banker_third_card = np.random.choice(sim_remaining_deck)
-                    sim_banker.append(banker_third_card)
-                    sim_remaining_deck.remove(banker_third_card)
-                elif banker_total == 4 and 2 <= player_third_value <= 7:
-                    banker_third_card = np.random.choice(sim_remaining_deck)
-                    sim_banker.append(banker_third_card)
-                    sim_remaining_deck.remove(banker_third_card)
-                elif banker_total == 5 and 4 <= player_third_value <= 7:
-                    banker_third_card = np.random.choice(sim_remaining_deck)
-                    sim_banker.append(banker_third_card)
-                    sim_remaining_deck.remove(banker_third_card)
-                elif banker_total == 6 and player_third_value in [6, 7]:
-                    banker_third_card = np.random.choice(sim_remaining_deck)
-                    sim_banker.append(banker_third_card)
-                    sim_remaining_deck.remove(banker_third_card)
+            player_third_value = CARD_POINTS[sim_player[2]] if len(sim_player) == 3 else None
+            if banker_should_draw(banker_total, player_third_value):
+                sim_banker.append(sim_remaining_deck.pop(rng.integers(len(sim_remaining_deck))))
 
         # Determine winner of this simulation
         winner = determine_winner(sim_player, sim_banker)
@@ -94,4 +162,199 @@ def calculate_win_probabilities(player_hand, banker_hand, deck):
 
     # Calculate probabilities as percentages
     total = sum(outcomes.values())
-    return {k: v / total * 100 for k, v in outcomes.items()}
\ No newline at end of file
+    return {k: v / total * 100 for k, v in outcomes.items()}
+
+# Point value per classid (index 0 is the empty slot)
+_CLASSID_POINTS = np.array(CARD_POINTS, dtype=np.int8)
+_RANK_POINTS = np.array(RANK_POINTS, dtype=np.int8)
+# Upper bound on the (states x simulations x ranks) scratch array per chunk
+_BATCH_CHUNK_ELEMENTS = 1 << 22
+
+def hands_to_array(hands):
+    """
+    Encode hands as an (N, 3) int array of classids (1-52), padded with 0.
+
+    Args:
+        hands (list): One list of classids per hand.
+    """
+    encoded = np.zeros((len(hands), 3), dtype=np.int16)
+    for row, hand in enumerate(hands):
+        encoded[row, :len(hand)] = hand
+    return encoded
+
+def calculate_win_probabilities_batch(player_hands, banker_hands, shoes=None, num_simulations=10000, rng=None):
+    """
+    Estimate win probabilities for many game states at once with vectorized sampling.
+
+    Args:
+        player_hands (array): (N, 3) classids of Player's cards, 0 for an empty slot.
+        banker_hands (array): (N, 3) classids of Banker's cards, 0 for an empty slot.
+        shoes (array, optional): (N, 13) or (13,) remaining rank counts with the cards on
+            the table already removed. Defaults to a fresh 52-card deck minus each hand.
+        num_simulations (int): Number of games to sample per state.
+        rng (np.random.Generator or int, optional): Random generator or seed.
+
+    Returns:
+        np.ndarray: (N, 3) probabilities in percentages, columns Player, Banker, Tie.
+    """
+    rng = np.random.default_rng(rng)
+    player_hands = np.asarray(player_hands, dtype=np.int16)
+    banker_hands = np.asarray(banker_hands, dtype=np.int16)
+    num_states = player_hands.shape[0]
+
+    if shoes is None:
+        shoes = np.full((num_states, NUM_RANKS), 4, dtype=np.int32)
+        for hands in (player_hands, banker_hands):
+            dealt = hands > 0
+            rows, cols = np.nonzero(dealt)
+            np.subtract.at(shoes, (rows, (hands[rows, cols] - 1) % NUM_RANKS), 1)
+    else:
+        shoes = np.broadcast_to(np.asarray(shoes, dtype=np.int32), (num_states, NUM_RANKS))
+
+    chunk = max(1, _BATCH_CHUNK_ELEMENTS // (num_simulations * NUM_RANKS))
+    results = np.empty((num_states, 3), dtype=np.float64)
+    for start in range(0, num_states, chunk):
+        stop = start + chunk
+        results[start:stop] = _simulate_batch(
+            player_hands[start:stop], banker_hands[start:stop], shoes[start:stop], num_simulations, rng
+        )
+    return results / num_simulations * 100
+
+def _draw_ranks(cumulative, remaining, rng, shape):
+    """Sample one rank per simulation from cumulative rank counts (N, S, 13) or (N, 1, 13)."""
+    draws = np.floor(rng.random(shape) * remaining).astype(np.int32)
+    return (draws[..., None] >= cumulative).sum(axis=-1)
+
+def _simulate_batch(player_hands, banker_hands, shoes, num_simulations, rng):
+    num_states = player_hands.shape[0]
+    shape = (num_states, num_simulations)
+
+    player_cards = (player_hands > 0).sum(axis=1)
+    banker_cards = (banker_hands > 0).sum(axis=1)
+    player_total = _CLASSID_POINTS[player_hands].sum(axis=1) % 10
+    banker_total = _CLASSID_POINTS[banker_hands].sum(axis=1) % 10
+
+    # Same deterministic cases as the scalar function: naturals and complete hands
+    natural = ((player_cards == 2) & (player_total >= 8)) | ((banker_cards == 2) & (banker_total >= 8))
+    settled = natural | ((player_cards == 3) & (banker_cards == 3))
+
+    # Player's third card rule
+    player_draws = ~settled & (player_cards == 2) & (player_total <= 5)
+    cumulative = np.cumsum(shoes, axis=1)[:, None, :]
+    remaining = shoes.sum(axis=1)
+    player_rank = _draw_ranks(cumulative, remaining[:, None], rng, shape)
+    player_third = np.where(player_draws[:, None], _RANK_POINTS[player_rank], -1)
+    player_final = np.where(player_draws[:, None], (player_total[:, None] + player_third) % 10, player_total[:, None])
+    # A third card already on the table still drives Banker's rule
+    dealt_third = np.where(player_cards == 3, _CLASSID_POINTS[player_hands[:, 2]], -1)
+    player_third = np.where(player_draws[:, None], player_third, dealt_third[:, None])
+
+    # Banker's third card rule, applied element-wise
+    bt = banker_total[:, None]
+    stood = player_third < 0
+    banker_draws = (~settled & (banker_cards == 2))[:, None] & (
+        (stood & (bt <= 5))
+        | (~stood & (
+            (bt <= 2)
+            | ((bt == 3) & (player_third != 8))
+            | ((bt == 4) & (player_third >= 2) & (player_third <= 7))
+            | ((bt == 5) & (player_third >= 4) & (player_third <= 7))
+            | ((bt == 6) & ((player_third == 6) | (player_third == 7)))
+        ))
+    )
+
+    # Banker draws from the shoe minus Player's third card
+    taken = player_draws[:, None, None] & (player_rank[..., None] <= np.arange(NUM_RANKS))
+    banker_rank = _draw_ranks(cumulative - taken, remaining[:, None] - player_draws[:, None], rng, shape)
+    banker_final = np.where(banker_draws, (bt + _RANK_POINTS[banker_rank]) % 10, bt)
+
+    player_wins = (player_final > banker_final).sum(axis=1)
+    banker_wins = (banker_final > player_final).sum(axis=1)
+    ties = num_simulations - player_wins - banker_wins
+    return np.stack([player_wins, banker_wins, ties], axis=1)
+
+# Payout per unit bet on a win, in the same order as the batch columns (Player, Banker, Tie)
+_PAYOUTS = np.array([1.0, 0.95, 8.0])
+# Process pools for adaptive sampling, keyed by worker count and reused across calls
+_executors = {}
+
+def adaptive_monte_carlo(player_hand, banker_hand, deck, tolerance=0.5, confidence=0.95, chunk_size=5000,
+                         chunks_per_round=4, max_simulations=200000, workers=0, seed=None):
+    """
+    Sample games in chunks until every estimate is within `tolerance`.
+
+    Sampling stops once the confidence-interval half-width of each probability is at
+    most `tolerance` percentage points and the sign of each bet's EV is settled (its
+    interval excludes zero, or is itself narrower than `tolerance` / 100), or once
+    `max_simulations` games have been sampled.
+
+    Every chunk draws from its own child of `np.random.SeedSequence(seed)`, and chunks
+    are checked in fixed rounds of `chunks_per_round`, so the result depends only on the
+    seed and never on `workers`.
+
+    Args:
+        player_hand (list): Player's int cards.
+        banker_hand (list): Banker's int cards.
+        deck (ShoeState or list): Remaining shoe, as for calculate_win_probabilities.
+        tolerance (float): Target CI half-width in percentage points.
+        confidence (float): Two-sided confidence level of the intervals.
+        chunk_size (int): Games sampled per chunk.
+        chunks_per_round (int): Chunks sampled between two stopping checks.
+        max_simulations (int): Upper bound on the number of games.
+        workers (int): Worker processes for the chunks; 0 or 1 samples in-process.
+        seed (int, optional): Root seed; None draws fresh OS entropy.
+
+    Returns:
+        tuple: (probabilities dict in percentages, details dict with 'simulations',
+            'seed', 'half_widths' and 'expected_values').
+    """
+    player_row = hands_to_array([player_hand])
+    banker_row = hands_to_array([banker_hand])
+    shoe = np.array([_rank_counts(player_hand, banker_hand, deck)], dtype=np.int32)
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    seed_sequence = np.random.SeedSequence(seed)
+    executor = _get_executor(workers)
+
+    wins = np.zeros(3, dtype=np.int64)
+    simulations = 0
+    while simulations < max_simulations:
+        # The last round is trimmed so no more than max_simulations games are sampled
+        remaining = max_simulations - simulations
+        chunk_count = min(chunks_per_round, -(-remaining // chunk_size))
+        chunk_sizes = [min(chunk_size, remaining - i * chunk_size) for i in range(chunk_count)]
+        chunk_seeds = seed_sequence.spawn(chunk_count)
+        args = ([player_row] * chunk_count, [banker_row] * chunk_count, [shoe] * chunk_count, chunk_sizes, chunk_seeds)
+        chunk_wins = executor.map(_simulate_chunk, *args) if executor else map(_simulate_chunk, *args)
+        for counts in chunk_wins:
+            wins += counts
+        simulations += sum(chunk_sizes)
+
+        p = wins / simulations
+        half_widths = z * np.sqrt(p * (1 - p) / simulations)
+        # A bet pays `payout` with probability p and loses 1 otherwise
+        expected_values = p * (_PAYOUTS + 1) - 1
+        ev_half_widths = half_widths * (_PAYOUTS + 1)
+        sign_settled = (np.abs(expected_values) > ev_half_widths) | (ev_half_widths <= tolerance / 100)
+        if np.all(half_widths * 100 <= tolerance) and np.all(sign_settled):
+            break
+
+    probabilities = dict(zip(('player', 'banker', 'tie'), (p * 100).tolist()))
+    details = {
+        "simulations": simulations,
+        "seed": seed_sequence.entropy,
+        "half_widths": dict(zip(('player', 'banker', 'tie'), (half_widths * 100).tolist())),
+        "expected_values": dict(zip(('player', 'banker', 'tie'), expected_values.tolist())),
+    }
+    return probabilities, details
+
+def _simulate_chunk(player_row, banker_row, shoe, chunk_size, seed_sequence):
+    """Win counts of one chunk; module-level so worker processes can unpickle it."""
+    return _simulate_batch(player_row, banker_row, shoe, chunk_size, np.random.default_rng(seed_sequence))[0]
+
+def _get_executor(workers):
+    if workers <= 1:
+        return None
+    executor = _executors.get(workers)
+    if executor is None:
+        executor = _executors[workers] = ProcessPoolExecutor(max_workers=workers)
+    return executor
@@ -0,0 +1,91 @@
+# src/decision.py
+import re
+from dataclasses import dataclass
+
+# Option labels as numbered in the prompt
+DECISION_LABELS = {
+    "player": "(1) 投注玩家",
+    "banker": "(2) 投注庄家",
+    "tie": "(3) 投注和局",
+    "no_bet": "(4) 不下注",
+}
+
+# Markers of the four options the prompt asks the model to choose from
+DECISION_PATTERNS = {
+    "player": re.compile(r"\(1\)|投注玩家"),
+    "banker": re.compile(r"\(2\)|投注庄家"),
+    "tie": re.compile(r"\(3\)|投注和局"),
+    "no_bet": re.compile(r"\(4\)|不下注"),
+}
+
+OUTCOME_NAMES = {"player": "玩家", "banker": "庄家", "tie": "和局"}
+
+# Net win per unit bet (Banker pays 5% commission); a losing bet returns -1
+PAYOUTS = {"player": 1.0, "banker": 0.95, "tie": 8.0}
+
+def parse_decision(text):
+    """Return the first option named in generated text ('player', 'banker', 'tie', 'no_bet') or None."""
+    found = None
+    for decision, pattern in DECISION_PATTERNS.items():
+        match = pattern.search(text)
+        if match and (found is None or match.start() < found[0]):
+            found = (match.start(), decision)
+    return found[1] if found else None
+
+def compute_expected_values(probabilities):
+    """Expected value per unit bet from win probabilities in percentages."""
+    prob_player = probabilities['player'] / 100
+    prob_banker = probabilities['banker'] / 100
+    prob_tie = probabilities['tie'] / 100
+    return {
+        'player': prob_player * 1 + (prob_banker + prob_tie) * (-1),
+        'banker': prob_banker * 0.95 + (prob_player + prob_tie) * (-1),
+        'tie': prob_tie * 8 + (prob_player + prob_banker) * (-1),
+    }
+
+def settle_bet(decision, winner):
+    """Net result of one unit bet on `decision` when `winner` wins the hand (0 for no bet)."""
+    if decision == "no_bet":
+        return 0.0
+    return PAYOUTS[decision] if decision == winner else -1.0
+
+def decide(expected_values):
+    """Pick the bet with the largest positive EV, otherwise 'no_bet'."""
+    best = max(expected_values, key=expected_values.get)
+    return best if expected_values[best] > 0 else "no_bet"
+
+def render_explanation(decision, probabilities, expected_values, final=False):
+    """
+    Templated Chinese advice that states the conclusion first, like the LLM is asked to.
+
+    `final` says the cards settle the hand (see precompute.hand_is_final); only then is
+    the outcome stated as certain.
+    """
+    if final:
+        winner = max(probabilities, key=probabilities.get)
+        reason = f"本局结果已确定，{OUTCOME_NAMES[winner]}获胜，无需再抽牌。"
+    else:
+        reason = ""
+    if decision == "no_bet":
+        reason += "因所有选项皆为负值，选择 (4) 不下注。"
+    else:
+        reason += f"{OUTCOME_NAMES[decision]}投注的期望值为正且最大，因此选择 {DECISION_LABELS[decision]}。"
+    return (
+        f"结论：{DECISION_LABELS[decision]}。\n"
+        f"{reason}\n"
+        f"获胜概率：玩家 {probabilities['player']:.2f}%，庄家 {probabilities['banker']:.2f}%，和局 {probabilities['tie']:.2f}%。\n"
+        f"期望值：玩家投注 {expected_values['player']:.4f}，庄家投注 {expected_values['banker']:.4f}，"
+        f"和局投注 {expected_values['tie']:.4f}。"
+    )
+
+@dataclass
+class StructuredAdvice:
+    """Advice returned in structured mode; str() gives the advice text."""
+    decision: str  # 'player', 'banker', 'tie', 'no_bet', or None if no advice could be derived
+    probabilities: dict  # Percentages, None when the fallback answered before computing them
+    expected_values: dict
+    text: str
+    source: str  # "llm", "rules" or "fallback"
+
+    def __str__(self):
+        return self.text
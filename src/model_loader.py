@@ -1,33 +1,160 @@
 # src/model_loader.py
-from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
-import torch
+# torch and transformers are imported on first use, so building an advisor that never
+# needs the model (disabled, rule-based only) does not pay for importing them.
+import contextlib
+import copy
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
-class LLMModelLoader:
-    def __init__(self, model_path, use_gpu=True):
-        """Initialize the model loader with a model path and GPU option."""
-        self.model_path = model_path
-        self.use_gpu = use_gpu
-        self.device = "cuda" if torch.cuda.is_available() and use_gpu else "cpu"
-        if self.device == "cpu":
-            logger.warning(f"Using CPU. GPU available: {torch.cuda.is_available()}, use_gpu: {use_gpu}")
-        self.model = None
-        self.tokenizer = None
-        self._load_model()
+# Process-wide cache of loaded (model, tokenizer) pairs, keyed by (model_path, device, quantization)
+_model_registry = {}
+_registry_lock = threading.Lock()
 
-    def _load_model(self):
-        """Load the model and tokenizer with error handling."""
-        try:
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+QUANTIZATION_MODES = (None, "int8_dynamic")
+
+# Forward passes per thread and model id, counted by hooks installed by _count_forward_passes
+_forward_passes = threading.local()
+
+def quantize_model(model, quantization):
+    """
+    Apply CPU weight quantization to a loaded model.
+
+    "int8_dynamic" stores nn.Linear weights as int8 and quantizes activations on the
+    fly, which roughly quarters the linear-layer memory of a float32 model.
+    """
+    import torch
+
+    if quantization == "int8_dynamic":
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    raise ValueError(f"Unknown quantization: {quantization}")
+
+def _quantized_metadata(model_path, quantization):
+    """What a saved quantized state_dict depends on; a mismatch means it must be rebuilt."""
+    import os
+    import torch
+    import transformers
+
+    return {
+        "model_path": os.path.abspath(model_path) if os.path.exists(model_path) else model_path,
+        "quantization": quantization,
+        "torch_version": torch.__version__,
+        "transformers_version": transformers.__version__,
+    }
+
+@contextlib.contextmanager
+def _empty_parameters():
+    """
+    Create module parameters on the meta device: no memory and no initialization.
+
+    Buffers (e.g. rotary frequencies) are still built normally, since they are small
+    and not all of them are saved in a state_dict.
+    """
+    import torch
+
+    register_parameter = torch.nn.Module.register_parameter
+
+    def register_empty_parameter(module, name, param):
+        if param is not None:
+            param = torch.nn.Parameter(param.to("meta"), requires_grad=param.requires_grad)
+        register_parameter(module, name, param)
+
+    torch.nn.Module.register_parameter = register_empty_parameter
+    try:
+        yield
+    finally:
+        torch.nn.Module.register_parameter = register_parameter
+
+def _quantized_skeleton(model_path, quantization):
+    """
+    The model of `model_path` with the module layout quantize_model() produces, but
+    without weights: parameters are on the meta device and every nn.Linear is an empty
+    int8 dynamic Linear, ready for load_state_dict(..., assign=True).
+    """
+    import torch
+    from transformers import AutoConfig, AutoModelForCausalLM
+
+    if quantization != "int8_dynamic":
+        raise ValueError(f"Unknown quantization: {quantization}")
+    with _empty_parameters():
+        model = AutoModelForCausalLM.from_config(AutoConfig.from_pretrained(model_path), torch_dtype=torch.float32)
+    for module in list(model.modules()):
+        for name, child in module.named_children():
+            # quantize_dynamic swaps exactly nn.Linear, not its subclasses
+            if type(child) is torch.nn.Linear:
+                setattr(module, name, torch.ao.nn.quantized.dynamic.Linear(
+                    child.in_features, child.out_features, bias_=child.bias is not None, dtype=torch.qint8
+                ))
+    return model
+
+def _load_quantized(model_path, quantization, quantized_model_path):
+    """
+    Load a previously saved quantized model, or quantize the original and save it.
+
+    Only the quantized state_dict is saved (loaded with weights_only=True), next to a
+    `<quantized_model_path>.json` metadata file. On load, the metadata must match the
+    current model path, quantization and torch/transformers versions; the weights are
+    then assigned to an empty quantized skeleton built from the model's config, so the
+    full-precision model is never materialized.
+    """
+    import json
+    import os
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    metadata = _quantized_metadata(model_path, quantization)
+    metadata_path = f"{quantized_model_path}.json"
+    if quantized_model_path and os.path.exists(quantized_model_path) and os.path.exists(metadata_path):
+        with open(metadata_path, "r", encoding="utf-8") as file:
+            saved_metadata = json.load(file)
+        if saved_metadata == metadata:
+            logger.info(f"Loading {quantization} model from {quantized_model_path}")
+            model = _quantized_skeleton(model_path, quantization)
+            model.load_state_dict(torch.load(quantized_model_path, weights_only=True, mmap=True), assign=True)
+            return model
+        logger.warning(f"{quantized_model_path} was saved for {saved_metadata}, not {metadata}; quantizing again")
+
+    # Dynamic quantization works on float32 weights
+    model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=torch.float32, low_cpu_mem_usage=True)
+    model = quantize_model(model, quantization)
+    if quantized_model_path:
+        os.makedirs(os.path.dirname(os.path.abspath(quantized_model_path)), exist_ok=True)
+        torch.save(model.state_dict(), quantized_model_path)
+        with open(metadata_path, "w", encoding="utf-8") as file:
+            json.dump(metadata, file, indent=2)
+        logger.info(f"Saved {quantization} model to {quantized_model_path}")
+    return model
+
+def _load_shared(model_path, device, quantization=None, quantized_model_path=None):
+    """Load a model and tokenizer once per process and share them between loaders."""
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization: {quantization}")
+    if quantization and device != "cpu":
+        logger.warning(f"Quantization {quantization} is CPU-only; loading the unquantized model on {device}")
+        quantization = None
+    key = (model_path, device, quantization)
+    with _registry_lock:
+        if key in _model_registry:
+            logger.info(f"Reusing loaded model {model_path} on {device}")
+            return _model_registry[key]
+
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(model_path)
+        if quantization:
+            model = _load_quantized(model_path, quantization, quantized_model_path)
+        else:
             # self.model = AutoModelForCausalLM.from_pretrained(self.model_path, attn_implementation="flash_attention_2")
-            # self.model = AutoModelForCausalLM.from_pretrained(self.model_path)
 
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_path,
-                torch_dtype="auto"  # or torch.float16
-            )
+            # safetensors weights are memory-mapped and materialized tensor by tensor.
+            # On GPU, device_map places them directly on the device instead of loading
+            # to CPU and copying with .to(device), which doubled peak memory.
+            load_kwargs = {"torch_dtype": "auto", "low_cpu_mem_usage": True}
+            if device != "cpu":
+                load_kwargs["device_map"] = device
+            model = AutoModelForCausalLM.from_pretrained(model_path, **load_kwargs)
 
             # bnb_config = BitsAndBytesConfig(load_in_8bit=True)
             # self.model = AutoModelForCausalLM.from_pretrained(
@@ -36,9 +163,282 @@ class LLMModelLoader:
             #     device_map="auto"
             # )
 
-            self.model.to(self.device)
-            logger.info(f"Model loaded successfully from {self.model_path} on {self.device}")
+        model.eval()
+        _model_registry[key] = (model, tokenizer)
+        logger.info(f"Model loaded successfully from {model_path} on {device}" + (f" ({quantization})" if quantization else ""))
+        return _model_registry[key]
+
+class _GenerationTimer:
+    """Streamer for generate() that records when the first new token is produced."""
+
+    def __init__(self):
+        self._prompt_seen = False
+        self.first_token_time = None
+
+    def put(self, value):
+        # generate() passes the prompt ids first, then each new token
+        if not self._prompt_seen:
+            self._prompt_seen = True
+        elif self.first_token_time is None:
+            self.first_token_time = time.perf_counter()
+
+    def end(self):
+        pass
+
+def _count_forward_passes(model):
+    """Count the forward passes of a model per calling thread (installed once per model)."""
+    if getattr(model, "_forward_pass_hook", None) is not None:
+        return
+
+    def hook(module, args, output):
+        counts = _forward_passes.__dict__.setdefault("counts", {})
+        counts[id(module)] = counts.get(id(module), 0) + 1
+
+    model._forward_pass_hook = model.register_forward_hook(hook)
+
+def _forward_pass_count(model):
+    return _forward_passes.__dict__.get("counts", {}).get(id(model), 0)
+
+def clear_model_registry():
+    """Drop all shared models (they are freed once no loader references them)."""
+    with _registry_lock:
+        _model_registry.clear()
+
+class LLMModelLoader:
+    def __init__(self, model_path, use_gpu=True, lazy=False, quantization=None, quantized_model_path=None,
+                 draft_model_path=None):
+        """
+        Initialize the model loader with a model path and GPU option.
+
+        With lazy=True the model is loaded on first access to `model` or `tokenizer`.
+        Loaders pointing at the same model_path and device share one loaded model.
+        `quantization` ("int8_dynamic") quantizes the weights for CPU inference; the
+        result is saved to and reloaded from `quantized_model_path` when given.
+        `draft_model_path` names a small model with the same tokenizer that proposes
+        tokens for the main model to verify (assisted decoding) in generate().
+        """
+        self.model_path = model_path
+        self.use_gpu = use_gpu
+        self.quantization = quantization
+        self.quantized_model_path = quantized_model_path
+        self.draft_model_path = draft_model_path
+        self._device = None
+        self._model = None
+        self._draft_model = None
+        self._tokenizer = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self.prompt_prefix = ""
+        self._prefix_use_cache = False
+        self._prefix_ids = None
+        self._prefix_cache = None
+        if not lazy:
+            self._ensure_loaded()
+
+    @property
+    def device(self):
+        if self._device is None:
+            import torch
+
+            self._device = "cuda" if torch.cuda.is_available() and self.use_gpu else "cpu"
+            if self._device == "cpu":
+                logger.warning(f"Using CPU. GPU available: {torch.cuda.is_available()}, use_gpu: {self.use_gpu}")
+        return self._device
+
+    @property
+    def model(self):
+        self._ensure_loaded()
+        return self._model
+
+    @property
+    def tokenizer(self):
+        self._ensure_loaded()
+        return self._tokenizer
+
+    @property
+    def is_loaded(self):
+        return self._loaded
+
+    def load(self):
+        """Load the model now if it is not loaded yet; returns True if it is available."""
+        self._ensure_loaded()
+        return self._model is not None
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._load_model()
+                self._loaded = True
+
+    def _load_model(self):
+        """Load the model and tokenizer with error handling."""
+        try:
+            self._model, self._tokenizer = _load_shared(
+                self.model_path, self.device, self.quantization, self.quantized_model_path
+            )
+            if self.prompt_prefix:
+                self._encode_prefix()
         except Exception as e:
             logger.error(f"Error loading model: {e}")
-            self.model = None
-            self.tokenizer = None
\ No newline at end of file
+            self._model = None
+            self._tokenizer = None
+            return
+        if self.draft_model_path:
+            try:
+                self._draft_model, _ = _load_shared(self.draft_model_path, self.device)
+                _count_forward_passes(self._model)
+                _count_forward_passes(self._draft_model)
+            except Exception as e:
+                # Generation still works without the draft model, only slower
+                logger.error(f"Error loading draft model: {e}")
+                self._draft_model = None
+
+    @property
+    def draft_model(self):
+        self._ensure_loaded()
+        return self._draft_model
+
+    def warmup(self, max_new_tokens=2):
+        """Run a short generation so the first real request does not pay one-off setup costs."""
+        if self.model is None:
+            return
+        start_time = time.time()
+        self.generate("您的建议：", max_new_tokens=max_new_tokens)
+        logger.info(f"Model warm-up completed in {time.time() - start_time:.2f} seconds")
+
+    def set_prompt_prefix(self, prefix, use_cache=True):
+        """
+        Register the static prompt preamble and, if use_cache, prefill it once.
+
+        The preamble is tokenized on its own, so every request feeds the same prefix
+        tokens whether or not the cached keys/values are reused. If the model is not
+        loaded yet, this happens right after it is.
+        """
+        self.prompt_prefix = prefix
+        self._prefix_use_cache = use_cache
+        self._prefix_ids = None
+        self._prefix_cache = None
+        if self._loaded and self._model is not None:
+            self._encode_prefix()
+
+    def _encode_prefix(self):
+        import torch
+
+        self._prefix_ids = self._tokenizer(self.prompt_prefix, return_tensors="pt").input_ids.to(self.device)
+        self._prefix_cache = None
+        if self._prefix_use_cache:
+            with torch.no_grad():
+                self._prefix_cache = self._model(self._prefix_ids, use_cache=True).past_key_values
+            logger.info(f"Cached KV for {self._prefix_ids.shape[1]}-token prompt prefix")
+
+    def encode_prompt(self, prompt_suffix):
+        """Token ids of the registered prefix followed by the request suffix."""
+        import torch
+
+        self._ensure_loaded()
+        if self._prefix_ids is None:
+            return self.tokenizer(prompt_suffix, return_tensors="pt").input_ids.to(self.device)
+        suffix_ids = self.tokenizer(prompt_suffix, add_special_tokens=False, return_tensors="pt").input_ids.to(self.device)
+        return torch.cat([self._prefix_ids, suffix_ids], dim=1)
+
+    def generate(self, prompt_suffix, timings=None, **generate_kwargs):
+        """
+        Generate from prefix + suffix, prefilling only the suffix when the prefix is cached.
+
+        If a `timings` dict is given it is filled with 'tokenize', 'prefill' and 'decode'
+        seconds and 'generated_tokens'. Prefill ends when the first new token is emitted.
+
+        With a draft model, decoding is greedy and assisted: the draft proposes tokens
+        and the main model verifies them in one forward pass, giving the same output as
+        plain greedy decoding; the prefix KV cache is not used. `timings` then also gets 'draft_tokens',
+        'accepted_tokens' and 'acceptance_rate', estimated from forward-pass counts.
+        """
+        import torch
+
+        start_time = time.perf_counter()
+        input_ids = self.encode_prompt(prompt_suffix)
+        tokenized_time = time.perf_counter()
+        timer = None
+        if timings is not None and "streamer" not in generate_kwargs:
+            timer = generate_kwargs["streamer"] = _GenerationTimer()
+        draft_model = self._draft_model
+        if self._prefix_cache is not None and draft_model is None:
+            # generate() extends the cache in place, so each request works on its own copy
+            generate_kwargs["past_key_values"] = copy.deepcopy(self._prefix_cache)
+        if draft_model is not None:
+            # Assisted decoding does not stay aligned with a pre-filled cache (its output
+            # drifts from plain greedy decoding), so the whole prompt is prefilled instead
+            generate_kwargs.setdefault("assistant_model", draft_model)
+            generate_kwargs["do_sample"] = False
+            main_passes = _forward_pass_count(self._model)
+            draft_passes = _forward_pass_count(draft_model)
+        output_ids = self.model.generate(
+            input_ids=input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            **generate_kwargs
+        )
+        end_time = time.perf_counter()
+        if timings is not None:
+            timings["tokenize"] = tokenized_time - start_time
+            timings["generated_tokens"] = output_ids.shape[1] - input_ids.shape[1]
+            first_token_time = timer.first_token_time if timer and timer.first_token_time else end_time
+            timings["prefill"] = first_token_time - tokenized_time
+            timings["decode"] = end_time - first_token_time
+            if draft_model is not None:
+                # Each main-model pass emits its accepted draft tokens plus one token of its own
+                verify_passes = _forward_pass_count(self._model) - main_passes
+                draft_tokens = _forward_pass_count(draft_model) - draft_passes
+                accepted_tokens = max(0, timings["generated_tokens"] - verify_passes)
+                timings["draft_tokens"] = draft_tokens
+                timings["accepted_tokens"] = accepted_tokens
+                timings["acceptance_rate"] = accepted_tokens / draft_tokens if draft_tokens else None
+        return output_ids
+
+    def encode_prompts(self, prompt_suffixes):
+        """
+        Pad a batch of prompts into one tensor.
+
+        With a registered prefix the padding goes between the prefix and each suffix, so
+        every row starts with the same prefix tokens and can share the prefix KV cache.
+        Without one, rows are left-padded as usual for decoder-only generation.
+        """
+        import torch
+
+        self._ensure_loaded()
+        pad_id = self._pad_token_id()
+        add_special_tokens = self._prefix_ids is None
+        suffix_ids = [
+            self.tokenizer(suffix, add_special_tokens=add_special_tokens).input_ids
+            for suffix in prompt_suffixes
+        ]
+        max_len = max(len(ids) for ids in suffix_ids)
+        padded = torch.tensor([[pad_id] * (max_len - len(ids)) + ids for ids in suffix_ids], device=self.device)
+        mask = torch.tensor([[0] * (max_len - len(ids)) + [1] * len(ids) for ids in suffix_ids], device=self.device)
+        if self._prefix_ids is None:
+            return padded, mask
+        batch_size = len(prompt_suffixes)
+        prefix_ids = self._prefix_ids.expand(batch_size, -1)
+        input_ids = torch.cat([prefix_ids, padded], dim=1)
+        attention_mask = torch.cat([torch.ones_like(prefix_ids), mask], dim=1)
+        return input_ids, attention_mask
+
+    def _pad_token_id(self):
+        """The tokenizer's pad token, or EOS if it has none; 0 is a valid id."""
+        pad_id = self.tokenizer.pad_token_id
+        return self.tokenizer.eos_token_id if pad_id is None else pad_id
+
+    def generate_batch(self, prompt_suffixes, **generate_kwargs):
+        """
+        Generate for several prompts in one padded batch; returns output ids, one row per prompt.
+
+        Assisted decoding only supports one sequence at a time, so the draft model is not used here.
+        """
+        input_ids, attention_mask = self.encode_prompts(prompt_suffixes)
+        if self._prefix_cache is not None:
+            cache = copy.deepcopy(self._prefix_cache)
+            cache.batch_repeat_interleave(len(prompt_suffixes))
+            generate_kwargs["past_key_values"] = cache
+        generate_kwargs.setdefault("pad_token_id", self._pad_token_id())
+        return self.model.generate(input_ids=input_ids, attention_mask=attention_mask, **generate_kwargs)
@@ -0,0 +1,135 @@
+# src/precompute.py
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from src.baccarat_rules import (
+    calculate_hand_value,
+    player_should_draw,
+    banker_should_draw,
+    card_rank,
+    card_value,
+)
+
+logger = logging.getLogger(__name__)
+
+# Stand-in for a dealt card of a resultlist (same index/classid attributes)
+DealtCard = namedtuple("DealtCard", ["index", "classid"])
+
+def next_card_index(resultlist):
+    """
+    Position (1-6) of the next card to be dealt in this hand, or None when the hand is complete.
+
+    Indices 1-4 are the initial cards, 5 is Player's third card and 6 is Banker's.
+    """
+    cards = {card.index: card.classid for card in resultlist}
+    for index in (1, 2, 3, 4):
+        if index not in cards:
+            return index
+    if 6 in cards:
+        return None
+    player_total = calculate_hand_value([cards[1], cards[3]])
+    banker_total = calculate_hand_value([cards[2], cards[4]])
+    if player_total >= 8 or banker_total >= 8:
+        return None
+    if 5 in cards:
+        return 6 if banker_should_draw(banker_total, card_value(cards[5])) else None
+    if player_should_draw(player_total):
+        return 5
+    return 6 if banker_should_draw(banker_total) else None
+
+def initial_cards_dealt(resultlist):
+    """True once the four initial cards (indices 1-4) are on the table."""
+    indices = {card.index for card in resultlist}
+    return all(index in indices for index in (1, 2, 3, 4))
+
+def hand_is_final(resultlist):
+    """True when no more cards will be dealt: a natural 8/9, or both hands done under the third-card rules."""
+    return next_card_index(resultlist) is None
+
+def _state_key(resultlist):
+    return tuple(sorted((card.index, card.classid) for card in resultlist))
+
+class NextCardPrecomputer:
+    """
+    Precompute the state after every possible next card of a table in the background.
+
+    `compute(resultlist, shoe)` builds the entry of one state (probabilities, prompt,
+    ...). Each table keeps only the entries for the next card of its latest hand, and
+    at most `max_tables` tables are kept, least recently scheduled first out.
+    """
+
+    def __init__(self, compute, max_tables=64, workers=1):
+        self._compute = compute
+        self.max_tables = max_tables
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="precompute")
+        self._tables = OrderedDict()  # gmcode -> {state key: (shoe counts, entry)}
+        self._generations = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, gmcode, resultlist, shoe):
+        """
+        Start precomputing the next-card states of a table's current hand.
+
+        Only states where both hands hold at least two cards are precomputed.
+
+        Returns:
+            Future or None: Resolves once the table's entries are stored.
+        """
+        next_index = next_card_index(resultlist)
+        with self._lock:
+            generation = self._generations.get(gmcode, 0) + 1
+            self._generations[gmcode] = generation
+            self._tables.pop(gmcode, None)
+            if next_index is None or next_index < 4:
+                self._futures.pop(gmcode, None)
+                return None
+            future = self._executor.submit(self._run, gmcode, generation, list(resultlist), shoe.copy(), next_index)
+            self._futures[gmcode] = future
+            return future
+
+    def _run(self, gmcode, generation, resultlist, shoe, next_index):
+        entries = {}
+        try:
+            for classid in range(1, 53):
+                rank = card_rank(classid)
+                if not shoe.can_draw(rank):
+                    continue
+                next_shoe = shoe.copy()
+                next_shoe.draw(rank)
+                next_resultlist = resultlist + [DealtCard(next_index, classid)]
+                entries[_state_key(next_resultlist)] = (bytes(next_shoe.counts), self._compute(next_resultlist, next_shoe))
+                if self._generations.get(gmcode) != generation:
+                    return  # A newer card arrived; this hand state is stale
+        except Exception as e:
+            logger.error(f"Error precomputing next-card states for table {gmcode}: {e}")
+            return
+
+        with self._lock:
+            if self._generations.get(gmcode) != generation:
+                return
+            self._tables[gmcode] = entries
+            self._tables.move_to_end(gmcode)
+            while len(self._tables) > self.max_tables:
+                evicted, _ = self._tables.popitem(last=False)
+                self._generations.pop(evicted, None)
+                self._futures.pop(evicted, None)
+
+    def lookup(self, gmcode, resultlist, shoe):
+        """Return the precomputed entry of this state, or None if missing or computed for another shoe."""
+        with self._lock:
+            entries = self._tables.get(gmcode)
+            found = entries.get(_state_key(resultlist)) if entries else None
+        if found is None or found[0] != bytes(shoe.counts):
+            return None
+        return found[1]
+
+    def wait(self, gmcode, timeout=None):
+        """Block until the table's pending precomputation (if any) has finished."""
+        future = self._futures.get(gmcode)
+        if future is not None:
+            future.result(timeout)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,306 @@
+# src/replay.py
+"""
+Replay recorded hands through the advisor for offline evaluation.
+
+    python -m src.replay hands.jsonl --output results.jsonl
+    python -m src.replay hands.csv --output results.jsonl --llm --checkpoint results.ckpt.json
+
+Each input record is one advice request: the table code, the cards dealt so far and,
+optionally, how the hand ended. JSONL lines look like
+
+    {"gmcode": "T1", "cards": [[1, 2], [2, 21], [3, 15], [4, 9]], "winner": "banker"}
+
+where cards are [index, classid] pairs (or {"index": ..., "classid": ...} objects) and
+`final_cards` may replace `winner`. CSV files have the columns gmcode, cards, winner
+and final_cards, with cards written as "1:2 2:21 3:15 4:9". Records of a table must
+appear in dealing order, so its shoe can be tracked.
+
+Hands are read lazily and processed in batches; each batch's results are appended to
+the output JSONL before the checkpoint is updated, so an interrupted run resumes
+from the last completed batch.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from itertools import islice
+import numpy as np
+from src.advisor import BaccaratLLMAdvisor
+from src.baccarat_rules import determine_winner
+from src.baccarat_stats import calculate_win_probabilities_batch, hands_to_array
+from src.decision import compute_expected_values, decide, parse_decision, settle_bet
+from src.precompute import DealtCard, initial_cards_dealt
+from src.utils import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two progress log lines
+PROGRESS_INTERVAL = 10.0
+
+def read_hands(path):
+    """Yield one record dict per line of a JSONL or CSV file; malformed lines yield {'error': ...}."""
+    with open(path, "r", newline="", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(file)
+            return
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {"error": f"Invalid JSON: {e}"}
+
+def _parse_cards(cards):
+    if isinstance(cards, str):
+        cards = [item.split(":") for item in cards.split()]
+    parsed = [
+        DealtCard(int(card["index"]), int(card["classid"])) if isinstance(card, dict)
+        else DealtCard(int(card[0]), int(card[1]))
+        for card in cards
+    ]
+    # Checked before the cards reach the shoe tracker
+    for card in parsed:
+        if not 1 <= card.index <= 6:
+            raise ValueError(f"Card index out of range 1-6: {card.index}")
+        if not 1 <= card.classid <= 52:
+            raise ValueError(f"Card classid out of range 1-52: {card.classid}")
+    return parsed
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def _new_summary():
+    return {"hands": 0, "errors": 0, "bets": 0, "settled_bets": 0, "profit": 0.0, "expected_profit": 0.0, "llm_hands": 0}
+
+class HandReplayer:
+    """Run recorded hands through an advisor's probability, decision and (optionally) LLM stages."""
+
+    def __init__(self, advisor, batch_size=256, use_llm=False):
+        self.advisor = advisor
+        self.batch_size = batch_size
+        self.use_llm = use_llm
+
+    def _parse_record(self, record):
+        if "error" in record:
+            raise ValueError(record["error"])
+        cards = _parse_cards(record["cards"])
+        winner = record.get("winner") or None
+        if winner is None and record.get("final_cards"):
+            final_state = self.advisor._format_cards_for_prompt(_parse_cards(record["final_cards"]))
+            winner = determine_winner(final_state["player_hand"], final_state["banker_hand"])
+        if winner not in (None, "player", "banker", "tie"):
+            raise ValueError(f"Unknown winner: {winner}")
+        return str(record.get("gmcode", "")), cards, winner
+
+    def _probabilities(self, states, start_position):
+        """
+        Probabilities of every state; "monte_carlo" runs as one vectorized batch.
+
+        With a `random_seed`, each batch samples from its own seed derived from the seed and
+        the batch's first record, so batches are independent and resumed runs reproducible.
+        """
+        config = self.advisor.config
+        if config.get("probability_method", "exact") != "monte_carlo":
+            return [self.advisor._calculate_probabilities(state["game_state"], state["deck"]) for state in states]
+        seed = config.get("random_seed")
+        batch = calculate_win_probabilities_batch(
+            hands_to_array([state["game_state"]["player_hand"] for state in states]),
+            hands_to_array([state["game_state"]["banker_hand"] for state in states]),
+            shoes=np.array([state["deck"].counts for state in states], dtype=np.int32),
+            num_simulations=config.get("num_simulations", 10000),
+            rng=None if seed is None else np.random.SeedSequence([seed, start_position]),
+        )
+        return [dict(zip(("player", "banker", "tie"), row.tolist())) for row in batch]
+
+    def _generate(self, suffixes):
+        """LLM advice for several prompt suffixes, in padded batches of batch_max_size."""
+        loader = self.advisor.model_loader
+        step = self.advisor.config.get("batch_max_size", 8)
+        texts = []
+        for start in range(0, len(suffixes), step):
+            output_ids = loader.generate_batch(
+                suffixes[start:start + step], max_new_tokens=self.advisor.config.get("max_new_tokens", 150)
+            )
+            # Generated rows start with the prompt, which ends with "您的建议："
+            texts.extend(loader.tokenizer.decode(row, skip_special_tokens=True).rsplit("您的建议：", 1)[-1].strip()
+                         for row in output_ids)
+        return texts
+
+    def process_batch(self, records, start_position):
+        """Return one result dict per record of a batch, in input order."""
+        results = []
+        states = []
+        for offset, record in enumerate(records):
+            result = {"record": start_position + offset}
+            results.append(result)
+            try:
+                gmcode, cards, winner = self._parse_record(record)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                result["error"] = str(e)
+                continue
+            deck = self.advisor.shoe_tracker.observe(gmcode, cards)
+            states.append({
+                "result": result,
+                "gmcode": gmcode,
+                "winner": winner,
+                "cards": cards,
+                "game_state": self.advisor._format_cards_for_prompt(cards),
+                # Later records of the same table mutate the tracked shoe
+                "deck": deck.copy(),
+            })
+
+        llm_states = []
+        for state, probabilities in zip(states, self._probabilities(states, start_position)):
+            expected_values = compute_expected_values(probabilities)
+            state["result"].update(
+                gmcode=state["gmcode"],
+                player_hand=state["game_state"]["player_hand"],
+                banker_hand=state["game_state"]["banker_hand"],
+                probabilities=probabilities,
+                expected_values=expected_values,
+                decision=decide(expected_values),
+                source="rules",
+                winner=state["winner"],
+            )
+            if not initial_cards_dealt(state["cards"]):
+                # Fewer than two cards per side: the probabilities say nothing yet
+                state["result"].update(decision=None, source="fallback")
+            if self.use_llm and self.advisor._use_llm(state["cards"]):
+                state["probabilities"] = probabilities
+                llm_states.append(state)
+
+        if llm_states and self.advisor._model_available():
+            suffixes = [self.advisor._create_prompt_suffix(state["game_state"], state["probabilities"]) for state in llm_states]
+            try:
+                texts = self._generate(suffixes)
+            except Exception as e:
+                logger.error(f"Error generating advice for replayed batch: {e}")
+                texts = []
+            for state, text in zip(llm_states, texts):
+                decision = parse_decision(text)
+                state["result"].update(advice=text, source="llm")
+                if decision is not None:
+                    state["result"]["decision"] = decision
+
+        for state in states:
+            result = state["result"]
+            if state["winner"] is not None and result["decision"] is not None:
+                result["profit"] = settle_bet(result["decision"], state["winner"])
+        return results
+
+    def run(self, input_path, output_path, checkpoint_path=None):
+        """
+        Replay every record of `input_path`, appending results to `output_path`.
+
+        Returns:
+            dict: Totals over the whole input (including resumed progress), plus the
+                hands per second of this run.
+        """
+        checkpoint = _load_checkpoint(checkpoint_path, input_path)
+        if checkpoint:
+            processed = checkpoint["records"]
+            summary = checkpoint["summary"]
+            self.advisor.shoe_tracker.load_dict(checkpoint["shoes"])
+            # Drop results written after the last checkpoint
+            with open(output_path, "ab") as output:
+                output.truncate(checkpoint["output_bytes"])
+            logger.info(f"Resuming replay of {input_path} after {processed} records")
+        else:
+            processed = 0
+            summary = _new_summary()
+            open(output_path, "wb").close()
+
+        start_time = time.perf_counter()
+        last_report = start_time
+        hands_this_run = 0
+        records = islice(read_hands(input_path), processed, None)
+        with open(output_path, "ab") as output:
+            for batch in _batched(records, self.batch_size):
+                results = self.process_batch(batch, processed)
+                for result in results:
+                    _add_to_summary(summary, result)
+                    output.write((json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8"))
+                output.flush()
+                processed += len(batch)
+                hands_this_run += len(batch)
+                if checkpoint_path:
+                    _save_checkpoint(checkpoint_path, {
+                        "input": os.path.abspath(input_path),
+                        "records": processed,
+                        "output_bytes": output.tell(),
+                        "summary": summary,
+                        "shoes": self.advisor.shoe_tracker.to_dict(),
+                    })
+                now = time.perf_counter()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    logger.info(f"Replayed {processed} records ({hands_this_run / (now - start_time):.1f} hands/sec)")
+
+        elapsed = time.perf_counter() - start_time
+        return {
+            **summary,
+            "records": processed,
+            "elapsed_seconds": round(elapsed, 3),
+            "hands_per_second": round(hands_this_run / elapsed, 2) if elapsed > 0 else None,
+        }
+
+def _add_to_summary(summary, result):
+    if "error" in result:
+        summary["errors"] += 1
+        return
+    summary["hands"] += 1
+    summary["llm_hands"] += result["source"] == "llm"
+    if result["decision"] not in (None, "no_bet"):
+        summary["bets"] += 1
+        summary["expected_profit"] += result["expected_values"][result["decision"]]
+        if "profit" in result:
+            summary["settled_bets"] += 1
+            summary["profit"] += result["profit"]
+
+def _load_checkpoint(checkpoint_path, input_path):
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return None
+    try:
+        with open(checkpoint_path, "r", encoding="utf-8") as file:
+            checkpoint = json.load(file)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Error reading checkpoint {checkpoint_path}: {e}")
+        return None
+    if checkpoint.get("input") != os.path.abspath(input_path):
+        logger.error(f"Checkpoint {checkpoint_path} belongs to {checkpoint.get('input')}; starting over")
+        return None
+    return checkpoint
+
+def _save_checkpoint(checkpoint_path, checkpoint):
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(checkpoint, file)
+    os.replace(tmp_path, checkpoint_path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="Recorded hands (.jsonl or .csv)")
+    parser.add_argument("--output", required=True, help="Results JSONL path")
+    parser.add_argument("--config", default="config/llm_advisor_config_llama_3.yaml", help="Advisor YAML config")
+    parser.add_argument("--checkpoint", help="Checkpoint path; an existing checkpoint resumes the run")
+    parser.add_argument("--batch-size", type=int, default=256, help="Records per batch")
+    parser.add_argument("--llm", action="store_true", help="Ask the LLM for hands that are not decided yet")
+    args = parser.parse_args()
+
+    setup_logging()
+    advisor = BaccaratLLMAdvisor(args.config)
+    summary = HandReplayer(advisor, batch_size=args.batch_size, use_llm=args.llm).run(
+        args.input, args.output, args.checkpoint
+    )
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
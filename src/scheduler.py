@@ -0,0 +1,87 @@
+# src/scheduler.py
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+class BatchInferenceScheduler:
+    """
+    Collect concurrent generation requests and run them as one batched `generate` call.
+
+    A background worker waits for the first request, then keeps collecting until
+    `batch_window_ms` has elapsed or `max_batch_size` requests are queued, pads them
+    into one batch and resolves each caller's future with its decoded text.
+    """
+
+    def __init__(self, model_loader, max_batch_size=8, batch_window_ms=20, generate_kwargs=None):
+        self.model_loader = model_loader
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window_ms / 1000
+        self.generate_kwargs = generate_kwargs or {}
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="batch-inference", daemon=True)
+        self._worker.start()
+
+    def submit(self, prompt_suffix):
+        """Queue a prompt suffix; returns a Future resolving to the decoded advice."""
+        if self._stopped.is_set():
+            raise RuntimeError("Scheduler is closed")
+        future = Future()
+        self._queue.put((prompt_suffix, future))
+        return future
+
+    async def submit_async(self, prompt_suffix):
+        """Awaitable variant of submit()."""
+        return await asyncio.wrap_future(self.submit(prompt_suffix))
+
+    def close(self):
+        """Stop the worker after the requests already queued have been served."""
+        self._stopped.set()
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                # Serve what we have, then let the next loop iteration see the stop marker
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+            prompts = [prompt for prompt, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                start_time = time.time()
+                output_ids = self.model_loader.generate_batch(prompts, **self.generate_kwargs)
+                texts = [self.model_loader.tokenizer.decode(row, skip_special_tokens=True) for row in output_ids]
+                logger.info(f"Batched generation of {len(batch)} requests completed in {time.time() - start_time:.2f} seconds")
+            except Exception as e:
+                logger.error(f"Error in batched generation: {e}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, text in zip(futures, texts):
+                future.set_result(text)
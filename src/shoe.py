@@ -0,0 +1,126 @@
+# src/shoe.py
+import logging
+import threading
+from array import array
+from src.baccarat_rules import NUM_RANKS, RANK_POINTS, card_rank
+
+logger = logging.getLogger(__name__)
+
+class ShoeState:
+    """Remaining rank counts of a multi-deck shoe."""
+    __slots__ = ("num_decks", "counts", "remaining")
+
+    def __init__(self, num_decks=8):
+        self.num_decks = num_decks
+        self.counts = array("H", [4 * num_decks] * NUM_RANKS)
+        self.remaining = 4 * num_decks * NUM_RANKS
+
+    def reset(self):
+        """Refill the shoe for a new shoe."""
+        for rank in range(NUM_RANKS):
+            self.counts[rank] = 4 * self.num_decks
+        self.remaining = 4 * self.num_decks * NUM_RANKS
+
+    def copy(self):
+        shoe = ShoeState.__new__(ShoeState)
+        shoe.num_decks = self.num_decks
+        shoe.counts = array("H", self.counts)
+        shoe.remaining = self.remaining
+        return shoe
+
+    def can_draw(self, rank):
+        return self.counts[rank] > 0
+
+    def draw(self, rank):
+        """Remove one card of the given rank index from the shoe."""
+        self.counts[rank] -= 1
+        self.remaining -= 1
+
+    def value_counts(self):
+        """Collapse the rank counts into 10 point-value counts (index = point value)."""
+        counts = [0] * 10
+        for rank in range(NUM_RANKS):
+            counts[RANK_POINTS[rank]] += self.counts[rank]
+        return counts
+
+class _TableState:
+    __slots__ = ("shoe", "hand")
+
+    def __init__(self, num_decks):
+        self.shoe = ShoeState(num_decks)
+        self.hand = {}  # card index -> classid already removed from the shoe
+
+class ShoeTracker:
+    """Track shoe composition per table (gmcode) as cards are dealt."""
+
+    def __init__(self, num_decks=8):
+        self.num_decks = num_decks
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _table(self, gmcode):
+        table = self._tables.get(gmcode)
+        if table is None:
+            table = self._tables[gmcode] = _TableState(self.num_decks)
+        return table
+
+    def get(self, gmcode):
+        """Return the ShoeState of a table, creating a full shoe if unseen."""
+        with self._lock:
+            return self._table(gmcode).shoe
+
+    def new_shoe(self, gmcode):
+        """Reset a table's shoe when the dealer starts a new one."""
+        with self._lock:
+            table = self._table(gmcode)
+            table.shoe.reset()
+            table.hand.clear()
+
+    def observe(self, gmcode, resultlist):
+        """
+        Remove newly seen cards of the current hand from the table's shoe.
+
+        `resultlist` holds every card dealt so far in the current hand, so only cards at
+        indices not seen before are drawn. A shorter list, or a different card at a known
+        index, means a new hand has started.
+
+        Returns:
+            ShoeState: The table's shoe after removing the seen cards.
+        """
+        with self._lock:
+            table = self._table(gmcode)
+            hand = table.hand
+            if len(resultlist) < len(hand) or any(hand.get(card.index, card.classid) != card.classid for card in resultlist):
+                hand.clear()
+            for card in resultlist:
+                if card.index in hand:
+                    continue
+                rank = card_rank(card.classid)
+                if not table.shoe.can_draw(rank):
+                    # More cards of this rank than one shoe holds: the dealer switched shoes
+                    logger.info(f"Shoe exhausted for rank index {rank} on table {gmcode}; starting a new shoe")
+                    table.shoe.reset()
+                    for index, classid in hand.items():
+                        table.shoe.draw(card_rank(classid))
+                table.shoe.draw(rank)
+                hand[card.index] = card.classid
+            return table.shoe
+
+    def to_dict(self):
+        """JSON-serializable snapshot of every table's shoe and current hand (for checkpoints)."""
+        with self._lock:
+            return {
+                gmcode: {"counts": list(table.shoe.counts), "hand": {str(index): classid for index, classid in table.hand.items()}}
+                for gmcode, table in self._tables.items()
+            }
+
+    def load_dict(self, state):
+        """Restore tables from a to_dict() snapshot."""
+        with self._lock:
+            self._tables.clear()
+            for gmcode, table_state in state.items():
+                table = self._table(gmcode)
+                for rank, count in enumerate(table_state["counts"]):
+                    table.shoe.counts[rank] = count
+                table.shoe.remaining = sum(table_state["counts"])
+                table.hand = {int(index): classid for index, classid in table_state["hand"].items()}
@@ -0,0 +1,78 @@
+# src/structured.py
+# Plain callables accepted by generate(logits_processor=..., stopping_criteria=...), so this
+# module does not import transformers; torch is imported on first call.
+from src.decision import DECISION_LABELS
+
+class StructuredDecoding:
+    """
+    Constrain one generate() call to a decision code followed by a short explanation.
+
+    The first generated tokens are forced to spell one of the DECISION_LABELS (e.g.
+    "(2) 投注庄家"); the model still picks which one. After it, free text follows until a
+    stop string appears after some non-whitespace text, or `max_explanation_tokens` tokens
+    have been generated. Use a new instance per generate() call.
+    """
+
+    def __init__(self, tokenizer, max_explanation_tokens=48, stop_strings=("\n",)):
+        self.tokenizer = tokenizer
+        self.max_explanation_tokens = max_explanation_tokens
+        self.stop_strings = tuple(stop_strings)
+        self.sequences = [
+            tokenizer(label, add_special_tokens=False).input_ids for label in DECISION_LABELS.values()
+        ]
+        self.max_new_tokens = max(len(sequence) for sequence in self.sequences) + max_explanation_tokens
+        self.prompt_length = None
+
+    def generate_kwargs(self):
+        return {
+            "logits_processor": [self.force_decision],
+            "stopping_criteria": [self.stop_explanation],
+            "max_new_tokens": self.max_new_tokens,
+        }
+
+    def _decision_length(self, generated):
+        """Length of the decision code that `generated` starts with, or None if it is not complete yet."""
+        for sequence in self.sequences:
+            if generated[:len(sequence)] == sequence:
+                return len(sequence)
+        return None
+
+    def force_decision(self, input_ids, scores):
+        """Logits processor: allow only tokens that continue a decision label."""
+        import torch
+
+        if self.prompt_length is None:
+            # The first call sees exactly the prompt
+            self.prompt_length = input_ids.shape[1]
+        step = input_ids.shape[1] - self.prompt_length
+        mask = torch.zeros_like(scores, dtype=torch.bool)
+        for row in range(input_ids.shape[0]):
+            generated = input_ids[row, self.prompt_length:].tolist()
+            allowed = {
+                sequence[step] for sequence in self.sequences
+                if len(sequence) > step and sequence[:step] == generated
+            }
+            if allowed:
+                mask[row] = True
+                mask[row, list(allowed)] = False
+        return scores.masked_fill(mask, float("-inf"))
+
+    def stop_explanation(self, input_ids, scores, **kwargs):
+        """Stopping criterion: a row is done once its explanation is full or a stop string follows its text."""
+        import torch
+
+        done = torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+        if self.prompt_length is None:
+            return done
+        for row in range(input_ids.shape[0]):
+            generated = input_ids[row, self.prompt_length:].tolist()
+            decision_length = self._decision_length(generated)
+            if decision_length is None:
+                continue
+            if len(generated) - decision_length >= self.max_explanation_tokens:
+                done[row] = True
+                continue
+            # Stop strings only count once the explanation has started, e.g. not a leading "\n"
+            explanation = self.tokenizer.decode(generated[decision_length:], skip_special_tokens=True).lstrip()
+            done[row] = any(stop in explanation for stop in self.stop_strings)
+        return done
@@ -1,17 +1,239 @@
-# src/utils.py
+import atexit
+import itertools
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import time
 from datetime import datetime
 
-def setup_logging(log_directory="logs"):
-    """Set up logging to file and console."""
+# Logger of the per-request advice records written by setup_logging(advice_records_path=...)
+ADVICE_RECORDS_LOGGER = "advice_records"
+
+# Minimum seconds between two "dropped log records" warnings
+DROPPED_REPORT_INTERVAL = 60.0
+
+_listener = None
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops records below WARNING instead of blocking when the queue is full.
+
+    Warnings and errors are never dropped: they replace the oldest queued record below
+    WARNING, or wait for room if there is none.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if record.levelno < logging.WARNING:
+            self.dropped += 1
+        elif self._replace_queued_info(record):
+            self.dropped += 1
+        else:
+            self.queue.put(record)
+
+    def _replace_queued_info(self, record):
+        with self.queue.mutex:
+            queued = self.queue.queue
+            for position, old in enumerate(queued):
+                # None is the listener's stop sentinel
+                if old is not None and old.levelno < logging.WARNING:
+                    del queued[position]
+                    queued.append(record)
+                    return True
+        return False
+
+class _SamplingFilter(logging.Filter):
+    """
+    Keep 1 of every N records of high-volume loggers.
+
+    `rates` maps a logger name (children included) to N. Warnings and errors are always kept.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+        self._counters = {name: itertools.count() for name in self.rates}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        name = record.name
+        while name:
+            if name in self.rates:
+                return next(self._counters[name]) % self.rates[name] == 0
+            name = name.rpartition(".")[0]
+        return True
+
+class _JsonLinesFormatter(logging.Formatter):
+    """One compact JSON object per record: the record's `advice` extra, or its message."""
+
+    def format(self, record):
+        payload = getattr(record, "advice", None) or {"message": record.getMessage()}
+        return json.dumps({"time": round(record.created, 3), **payload}, ensure_ascii=False, separators=(",", ":"))
+
+class _DeferredFlush:
+    """Mixin for stream handlers: skip the flush after every record; the listener flushes in batches."""
+
+    def flush(self):
+        pass
+
+    def flush_now(self):
+        super().flush()
+
+class _RotatingFileHandler(_DeferredFlush, logging.handlers.RotatingFileHandler):
+    pass
+
+class _TimedRotatingFileHandler(_DeferredFlush, logging.handlers.TimedRotatingFileHandler):
+    pass
+
+class _BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that flushes its handlers every `batch_size` records, or once the
+    queue has been idle or `flush_interval` seconds have passed since the last flush.
+    """
+
+    def __init__(self, log_queue, *handlers, batch_size=256, flush_interval=1.0, queue_handler=None):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_handler = queue_handler
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._reported_dropped = 0
+        self._last_dropped_report = time.monotonic()
+
+    def dequeue(self, block):
+        while True:
+            if self._pending and (self._pending >= self.batch_size or
+                                  time.monotonic() - self._last_flush >= self.flush_interval):
+                self.flush()
+            try:
+                record = self.queue.get(block, timeout=self.flush_interval if block else None)
+            except queue.Empty:
+                if not block:
+                    raise
+                if self._pending:
+                    self.flush()
+                continue
+            if record is not self._sentinel:
+                self._pending += 1
+            return record
+
+    def flush(self, report_dropped=False):
+        self._report_dropped(report_dropped)
+        for handler in self.handlers:
+            getattr(handler, "flush_now", handler.flush)()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def _report_dropped(self, force):
+        """Log how many records `queue_handler` dropped, at most every DROPPED_REPORT_INTERVAL seconds."""
+        if self.queue_handler is None:
+            return
+        dropped = self.queue_handler.dropped - self._reported_dropped
+        now = time.monotonic()
+        if dropped and (force or now - self._last_dropped_report >= DROPPED_REPORT_INTERVAL):
+            self._reported_dropped += dropped
+            self._last_dropped_report = now
+            self.handle(logging.makeLogRecord({
+                "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                "msg": f"Dropped {dropped} log records below WARNING because the log queue was full",
+            }))
+
+    def enqueue_sentinel(self):
+        # The queue is bounded: wait for the writer to make room rather than raise queue.Full
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        super().stop()
+        self.flush(report_dropped=True)
+
+def _file_handler(path, rotation, max_bytes, backup_count, when):
+    if rotation == "time":
+        return _TimedRotatingFileHandler(path, when=when, backupCount=backup_count, encoding="utf-8")
+    if rotation == "size":
+        return _RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    raise ValueError(f"Unknown log rotation: {rotation}")
+
+def setup_logging(log_directory="logs", level=logging.INFO, rotation="size", max_bytes=50 * 1024 * 1024,
+                  backup_count=10, when="midnight", batch_size=256, flush_interval=1.0, queue_size=10000,
+                  sample_rates=None, advice_records_path=None):
+    """
+    Set up logging to file and console without blocking the logging threads.
+
+    Log calls only put the record on a bounded queue; a background listener writes to
+    the rotating log file and the console and flushes them in batches. When the queue
+    is full, records below WARNING are dropped (their count is logged periodically and
+    at stop_logging()), while warnings and errors are always kept.
+
+    Args:
+        log_directory (str): Directory of the log file.
+        level (int): Root log level.
+        rotation (str): "size" (rotate at `max_bytes`) or "time" (rotate `when`, e.g. "midnight").
+        backup_count (int): Rotated files kept.
+        batch_size (int): Records written between two flushes.
+        flush_interval (float): Maximum seconds a written record waits for its flush.
+        queue_size (int): Records queued before new ones below WARNING are dropped.
+        sample_rates (dict, optional): Logger name -> keep 1 of N of its records below WARNING.
+        advice_records_path (str, optional): JSON-lines file of the advisor's per-request
+            advice records (logger "advice_records"); None disables them.
+
+    Returns:
+        QueueListener: The background writer (stopped automatically at exit).
+    """
+    global _listener
+    stop_logging()
+
     os.makedirs(log_directory, exist_ok=True)
     log_filename = os.path.join(log_directory, f"log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler(log_filename, encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
\ No newline at end of file
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    handlers = [_file_handler(log_filename, rotation, max_bytes, backup_count, when), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records_logger = logging.getLogger(ADVICE_RECORDS_LOGGER)
+    records_logger.propagate = False
+    for handler in list(records_logger.handlers):
+        records_logger.removeHandler(handler)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = _DroppingQueueHandler(log_queue)
+    if sample_rates:
+        queue_handler.addFilter(_SamplingFilter(sample_rates))
+    if advice_records_path:
+        os.makedirs(os.path.dirname(os.path.abspath(advice_records_path)), exist_ok=True)
+        records_handler = _file_handler(advice_records_path, rotation, max_bytes, backup_count, when)
+        records_handler.setFormatter(_JsonLinesFormatter())
+        # Only records routed through the advice records logger reach this handler
+        records_handler.addFilter(lambda record: record.name == ADVICE_RECORDS_LOGGER)
+        for handler in handlers:
+            handler.addFilter(lambda record: record.name != ADVICE_RECORDS_LOGGER)
+        handlers.append(records_handler)
+        records_logger.addHandler(queue_handler)
+        records_logger.setLevel(logging.INFO)
+    else:
+        records_logger.setLevel(logging.CRITICAL + 1)
+
+    logging.basicConfig(level=level, handlers=[queue_handler], force=True)
+    _listener = _BatchingQueueListener(log_queue, *handlers, batch_size=batch_size, flush_interval=flush_interval,
+                                       queue_handler=queue_handler)
+    _listener.start()
+    return _listener
+
+@atexit.register
+def stop_logging():
+    """Stop the background writer, flushing every queued record."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,18 @@
+import pytest
+from benchmarks.make_tiny_model import TINY_MODEL_PATH
+
+@pytest.fixture(scope="session")
+def tiny_model_path():
+    """Tiny randomly initialized model checked in under benchmarks/tiny_model."""
+    return TINY_MODEL_PATH
+
+@pytest.fixture
+def make_config(tmp_path):
+    """Write a YAML config and return its path."""
+    import yaml
+
+    def _make_config(**config):
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text(yaml.safe_dump(config), encoding="utf-8")
+        return str(config_path)
+    return _make_config
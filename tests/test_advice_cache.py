@@ -0,0 +1,62 @@
+from src.advice_cache import AdviceCache, canonical_key
+from src.advisor import BaccaratLLMAdvisor
+from src.metrics import metrics
+from src.shoe import ShoeState
+from tests.test_scenarios import MockCardInfo
+
+def test_canonical_key_ignores_suits_and_initial_order():
+    shoe = ShoeState(num_decks=8)
+    # A Spade + 2 Heart vs 2 Club + A Diamond
+    assert canonical_key([1, 15], [5], shoe) == canonical_key([28, 40], [18], shoe)
+    # Player's third card is kept apart from the first two
+    assert canonical_key([1, 2, 3], [5, 6], shoe) != canonical_key([1, 3, 2], [5, 6], shoe)
+    assert canonical_key([1, 15], [5], shoe, context=("model-a",)) != canonical_key([1, 15], [5], shoe, context=("model-b",))
+
+def test_lru_and_ttl():
+    cache = AdviceCache(max_entries=2, ttl_seconds=3600)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    expired = AdviceCache(ttl_seconds=0)
+    expired.put("a", "1")
+    expired._entries["a"] = (0.0, "1")
+    assert expired.get("a") is None
+
+def test_sqlite_store_survives_restart(tmp_path):
+    path = str(tmp_path / "advice.sqlite")
+    cache = AdviceCache(sqlite_path=path)
+    cache.put("key", "结论：(4) 不下注。")
+    cache.close()
+    reopened = AdviceCache(sqlite_path=path)
+    assert reopened.get("key") == "结论：(4) 不下注。"
+    assert len(reopened) == 1
+    reopened.close()
+
+def test_repeated_state_is_served_from_cache(make_config):
+    advisor = BaccaratLLMAdvisor(make_config(enabled=False, llm_mode="never", advice_cache=True))
+    metrics.reset()
+    hand = [MockCardInfo(1, 1), MockCardInfo(2, 2), MockCardInfo(3, 8), MockCardInfo(4, 3)]
+    same_ranks = [MockCardInfo(1, 27), MockCardInfo(2, 41), MockCardInfo(3, 21), MockCardInfo(4, 16)]
+    first = advisor.get_advice("T1", hand)
+    assert advisor.get_advice("T2", same_ranks) == first
+    paths = {c["labels"]["path"]: c["value"] for c in metrics.snapshot()["counters"] if c["name"] == "advisor_requests_total"}
+    assert paths == {"rules": 1, "cache": 1}
+
+def test_stream_and_get_advice_share_cached_replies(tiny_model_path, make_config):
+    advisor = BaccaratLLMAdvisor(make_config(model_path=tiny_model_path, use_gpu=False, max_new_tokens=8, advice_cache=True))
+    hand = [MockCardInfo(1, 1), MockCardInfo(2, 2), MockCardInfo(3, 8), MockCardInfo(4, 3)]
+    same_ranks = [MockCardInfo(1, 27), MockCardInfo(2, 41), MockCardInfo(3, 21), MockCardInfo(4, 16)]
+    metrics.reset()
+    reply = "".join(advisor.get_advice_stream("T1", hand)).strip()
+    # A cache hit renders the prompt of its own cards, not of the cached request's
+    advice = advisor.get_advice("T2", same_ranks)
+    game_state = advisor._format_cards_for_prompt(same_ranks)
+    assert f"玩家牌：{advisor._render_cards(game_state['player_hand'])}" in advice
+    assert advice.endswith("您的建议：" + reply)
+    # and the stream of a hit yields only the reply
+    assert "".join(advisor.get_advice_stream("T3", same_ranks)) == reply
+    paths = {c["labels"]["path"]: c["value"] for c in metrics.snapshot()["counters"] if c["name"] == "advisor_requests_total"}
+    assert paths == {"cache": 1}
@@ -0,0 +1,51 @@
+import asyncio
+from src.advisor import BaccaratLLMAdvisor, PROMPT_PREFIX
+from tests.test_scenarios import test_scenarios
+
+def test_prefix_cache_matches_uncached(tiny_model_path, make_config):
+    cached = BaccaratLLMAdvisor(make_config(model_path=tiny_model_path, use_gpu=False, max_new_tokens=24, lazy_load=False))
+    uncached = BaccaratLLMAdvisor(make_config(
+        model_path=tiny_model_path, use_gpu=False, max_new_tokens=24, lazy_load=False, prefix_cache=False
+    ))
+    assert cached.model_loader._prefix_cache is not None
+    assert uncached.model_loader._prefix_cache is None
+
+    for scenario in test_scenarios:
+        # Each advisor tracks its own shoe, so both see the same composition
+        advice = cached.get_advice("T1", scenario)
+        assert advice != cached._get_fallback_advice(scenario)
+        assert advice == uncached.get_advice("T1", scenario)
+
+def test_prompt_puts_static_preamble_first(tiny_model_path, make_config):
+    advisor = BaccaratLLMAdvisor(make_config(model_path=tiny_model_path, use_gpu=False))
+    game_state = advisor._format_cards_for_prompt(test_scenarios[1])
+    prompt = advisor._create_prompt(game_state, {'player': 30.0, 'banker': 60.0, 'tie': 10.0})
+    assert prompt.startswith(PROMPT_PREFIX)
+    assert prompt.endswith("您的建议：")
+
+def test_prompt_names_the_probability_method(make_config):
+    game_state = {"player_hand": [2, 3], "player_points": 5, "banker_hand": [10, 17], "banker_points": 4}
+    probabilities = {'player': 30.0, 'banker': 60.0, 'tie': 10.0}
+    exact = BaccaratLLMAdvisor(make_config(enabled=False))._create_prompt(game_state, probabilities)
+    sampled = BaccaratLLMAdvisor(make_config(enabled=False, probability_method="monte_carlo"))._create_prompt(
+        game_state, probabilities
+    )
+    assert "获胜概率(按剩余牌精确计算)" in exact
+    assert "获胜概率(以大量随机模拟估算)" in sampled
+    assert "千局" not in exact
+
+def test_stream_yields_generated_text(tiny_model_path, make_config):
+    advisor = BaccaratLLMAdvisor(make_config(model_path=tiny_model_path, use_gpu=False, max_new_tokens=24))
+    reference = BaccaratLLMAdvisor(make_config(model_path=tiny_model_path, use_gpu=False, max_new_tokens=24))
+    timings = {}
+    chunks = list(advisor.get_advice_stream("T1", test_scenarios[4], timings))
+    assert chunks
+    assert reference.get_advice("T1", test_scenarios[4]).endswith("".join(chunks))
+    assert 0 < timings["time_to_first_token"] <= timings["total_time"]
+
+def test_stream_async(tiny_model_path, make_config):
+    advisor = BaccaratLLMAdvisor(make_config(model_path=tiny_model_path, use_gpu=False, max_new_tokens=8))
+
+    async def collect():
+        return [chunk async for chunk in advisor.get_advice_stream_async("T1", test_scenarios[4])]
+    assert asyncio.run(collect())
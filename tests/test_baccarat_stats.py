@@ -0,0 +1,125 @@
+import math
+import pytest
+from src.advisor import BaccaratLLMAdvisor
+from src.baccarat_stats import (
+    adaptive_monte_carlo,
+    calculate_win_probabilities,
+    calculate_win_probabilities_batch,
+    hands_to_array,
+)
+from src.shoe import ShoeState
+from tests.test_scenarios import test_scenarios
+
+NUM_SIMULATIONS = 10000
+
+@pytest.fixture
+def advisor(tmp_path):
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("enabled: false\n", encoding="utf-8")
+    return BaccaratLLMAdvisor(str(config_path))
+
+@pytest.mark.parametrize("scenario_idx", range(len(test_scenarios)))
+def test_exact_matches_monte_carlo(advisor, scenario_idx):
+    game_state = advisor._format_cards_for_prompt(test_scenarios[scenario_idx])
+    player_hand = game_state['player_hand']
+    banker_hand = game_state['banker_hand']
+
+    exact = calculate_win_probabilities(player_hand, banker_hand, [], method="exact")
+    sampled = calculate_win_probabilities(
+        player_hand, banker_hand, [], method="monte_carlo", num_simulations=NUM_SIMULATIONS, seed=scenario_idx
+    )
+
+    assert sum(exact.values()) == pytest.approx(100.0)
+    for outcome in ('player', 'banker', 'tie'):
+        p = exact[outcome] / 100
+        # 5 standard errors of a binomial proportion, in percentage points
+        tolerance = 5 * math.sqrt(p * (1 - p) / NUM_SIMULATIONS) * 100 + 1e-9
+        assert abs(exact[outcome] - sampled[outcome]) <= tolerance
+
+def test_exact_known_value():
+    # Player 0 vs Banker 7: Player draws, Banker stands; Player wins on an 8 or 9
+    probabilities = calculate_win_probabilities([10, 26], [42, 43], [])
+    assert probabilities['player'] == pytest.approx(8 / 48 * 100)
+    assert probabilities['tie'] == pytest.approx(4 / 48 * 100)
+
+def test_third_card_eight_or_nine_is_not_a_natural():
+    # Player 2,3 draws a 4 for 9; Banker 10,4 still draws on Player's 4 and ties with a 5
+    player, banker = [2, 3, 4], [10, 17]
+    exact = calculate_win_probabilities(player, banker, [])
+    assert exact['tie'] == pytest.approx(4 / 47 * 100)
+    assert exact['player'] == pytest.approx(43 / 47 * 100)
+    sampled = calculate_win_probabilities(player, banker, [], method="monte_carlo", num_simulations=20000, seed=0)
+    batch = calculate_win_probabilities_batch(hands_to_array([player]), hands_to_array([banker]),
+                                              num_simulations=20000, rng=0)
+    assert sampled['tie'] == pytest.approx(exact['tie'], abs=1.0)
+    assert batch[0, 2] == pytest.approx(exact['tie'], abs=1.0)
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError):
+        calculate_win_probabilities([2, 16], [43, 40], [], method="bogus")
+
+def _scenario_hands(scenario):
+    player = [card.classid for card in scenario if card.index in [1, 3, 5]]
+    banker = [card.classid for card in scenario if card.index in [2, 4, 6]]
+    return player, banker
+
+def test_batch_matches_scalar(advisor):
+    hands = [_scenario_hands(scenario) for scenario in test_scenarios]
+    batch = calculate_win_probabilities_batch(
+        hands_to_array([player for player, _ in hands]),
+        hands_to_array([banker for _, banker in hands]),
+        num_simulations=NUM_SIMULATIONS,
+        rng=0,
+    )
+    for row, scenario in enumerate(test_scenarios):
+        game_state = advisor._format_cards_for_prompt(scenario)
+        exact = calculate_win_probabilities(game_state['player_hand'], game_state['banker_hand'], [])
+        for col, outcome in enumerate(('player', 'banker', 'tie')):
+            p = exact[outcome] / 100
+            tolerance = 5 * math.sqrt(p * (1 - p) / NUM_SIMULATIONS) * 100 + 1e-9
+            assert abs(batch[row, col] - exact[outcome]) <= tolerance
+
+def test_batch_with_shoe():
+    shoe = ShoeState(num_decks=8)
+    for rank in (9, 12, 2, 3):
+        shoe.draw(rank)
+    batch = calculate_win_probabilities_batch(
+        hands_to_array([[10, 26]]), hands_to_array([[42, 43]]), shoes=shoe.counts, num_simulations=50000, rng=1
+    )
+    exact = calculate_win_probabilities([10, 26], [42, 43], shoe)
+    assert batch[0, 0] == pytest.approx(exact['player'], abs=1.0)
+    assert batch[0, 2] == pytest.approx(exact['tie'], abs=1.0)
+
+def test_monte_carlo_is_reproducible_from_seed():
+    first = calculate_win_probabilities([10, 26], [42, 43], [], method="monte_carlo", num_simulations=500, seed=7)
+    second = calculate_win_probabilities([10, 26], [42, 43], [], method="monte_carlo", num_simulations=500, seed=7)
+    assert first == second
+
+def test_adaptive_stops_within_tolerance():
+    shoe = ShoeState(num_decks=8)
+    for rank in (9, 12, 2, 3):
+        shoe.draw(rank)
+    exact = calculate_win_probabilities([10, 26], [42, 43], shoe)
+    probabilities, details = adaptive_monte_carlo([10, 26], [42, 43], shoe, tolerance=0.5, seed=3)
+    assert details["simulations"] < 200000
+    for outcome in ('player', 'banker', 'tie'):
+        assert details["half_widths"][outcome] <= 0.5
+        # Two half-widths, about 4 standard errors
+        assert abs(probabilities[outcome] - exact[outcome]) <= 1.0
+
+def test_adaptive_stays_within_max_simulations():
+    shoe = ShoeState(num_decks=8)
+    _, details = adaptive_monte_carlo([1, 2], [3, 4], shoe, tolerance=0.01, chunk_size=3000, max_simulations=10000, seed=1)
+    assert details["simulations"] == 10000
+
+def test_adaptive_replays_from_seed_across_workers():
+    in_process = adaptive_monte_carlo([2, 16], [43, 40], [], tolerance=1.0, chunk_size=2000, seed=11)
+    pooled = adaptive_monte_carlo([2, 16], [43, 40], [], tolerance=1.0, chunk_size=2000, workers=2, seed=11)
+    assert in_process == pooled
+
+def test_prompt_renders_card_text(advisor):
+    game_state = advisor._format_cards_for_prompt(test_scenarios[0])
+    assert game_state['player_hand'] == [1, 8]
+    prompt = advisor._create_prompt(game_state, {'player': 100.0, 'banker': 0.0, 'tie': 0.0})
+    assert "玩家牌：A Spade，8 Spade（总计 9 点）" in prompt
+    assert "庄家牌：A Heart，4 Heart（总计 5 点）" in prompt
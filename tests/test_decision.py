@@ -0,0 +1,55 @@
+import pytest
+from src.advisor import BaccaratLLMAdvisor
+from src.decision import compute_expected_values, decide, parse_decision, render_explanation
+from tests.test_scenarios import MockCardInfo, test_scenarios
+
+def test_decide_picks_largest_positive_ev():
+    assert decide({'player': -0.11, 'banker': -0.13, 'tie': -0.01}) == "no_bet"
+    assert decide({'player': 0.2, 'banker': 0.5, 'tie': -1.0}) == "banker"
+
+def test_expected_values_of_decided_hand():
+    expected_values = compute_expected_values({'player': 100.0, 'banker': 0.0, 'tie': 0.0})
+    assert expected_values == pytest.approx({'player': 1.0, 'banker': -1.0, 'tie': -1.0})
+    assert decide(expected_values) == "player"
+
+def test_parse_decision():
+    assert parse_decision("因所有选项皆为负值，选择 (4) 不下注。") == "no_bet"
+    assert parse_decision("建议投注庄家，因为 (2) 的期望值最高") == "banker"
+    assert parse_decision("无法判断") is None
+
+def test_auto_mode_skips_llm_for_decided_hands(make_config):
+    advisor = BaccaratLLMAdvisor(make_config(enabled=False, llm_mode="auto"))
+    # Scenario 1 is a Player natural 9
+    advice = advisor.get_advice("T1", test_scenarios[0])
+    assert advice.startswith("结论：(1) 投注玩家")
+    assert parse_decision(advice) == "player"
+    # Scenario 5 is still undecided, so it needs the (unavailable) model
+    assert advice != advisor.get_advice("T1", test_scenarios[4])
+    assert advisor.get_advice("T1", test_scenarios[4]) == advisor._get_fallback_advice(test_scenarios[4])
+
+def test_never_mode_answers_every_hand(make_config):
+    advisor = BaccaratLLMAdvisor(make_config(enabled=False, llm_mode="never"))
+    for scenario in test_scenarios:
+        assert parse_decision(advisor.get_advice("T1", scenario)) is not None
+
+@pytest.mark.parametrize("llm_mode", ["auto", "never"])
+def test_partial_hands_are_not_decided(make_config, llm_mode):
+    advisor = BaccaratLLMAdvisor(make_config(enabled=False, llm_mode=llm_mode, structured_output=True))
+    two_cards = [MockCardInfo(1, 2), MockCardInfo(2, 43)]
+    three_cards = two_cards + [MockCardInfo(3, 15)]
+    for resultlist in (two_cards, three_cards):
+        advice = advisor.get_advice("T1", resultlist)
+        assert advice.source == "fallback"
+        assert advice.decision is None
+        assert "本局结果已确定" not in advice.text
+
+def test_only_final_hands_are_called_certain(make_config):
+    advisor = BaccaratLLMAdvisor(make_config(enabled=False, llm_mode="never"))
+    # Scenario 1 is a Player natural 9
+    assert "本局结果已确定" in advisor.get_advice("T1", test_scenarios[0])
+    # Player 2,3 + 4 = 9 against Banker 10,4: Banker's third card is still to come
+    waiting_for_banker = [MockCardInfo(1, 2), MockCardInfo(2, 10), MockCardInfo(3, 3), MockCardInfo(4, 17),
+                          MockCardInfo(5, 4)]
+    assert "本局结果已确定" not in advisor.get_advice("T2", waiting_for_banker)
+    certain = {"player": 100.0, "banker": 0.0, "tie": 0.0}
+    assert "本局结果已确定" not in render_explanation("player", certain, compute_expected_values(certain))
@@ -0,0 +1,117 @@
+import json
+import logging
+import queue
+import threading
+import time
+import pytest
+from src.advisor import BaccaratLLMAdvisor
+from src.utils import (
+    ADVICE_RECORDS_LOGGER,
+    _BatchingQueueListener,
+    _DroppingQueueHandler,
+    setup_logging,
+    stop_logging,
+)
+from tests.test_scenarios import test_scenarios
+
+@pytest.fixture
+def log_dir(tmp_path):
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    yield tmp_path
+    stop_logging()
+    root.handlers[:] = saved_handlers
+    root.setLevel(saved_level)
+    records_logger = logging.getLogger(ADVICE_RECORDS_LOGGER)
+    records_logger.handlers.clear()
+    records_logger.setLevel(logging.NOTSET)
+    records_logger.propagate = True
+
+def _log_lines(directory):
+    (log_file,) = directory.glob("log_*.log")
+    return log_file.read_text(encoding="utf-8").splitlines()
+
+def test_records_are_written_by_the_background_listener(log_dir):
+    listener = setup_logging(str(log_dir), flush_interval=0.05)
+    # The logging thread only enqueues
+    assert [type(handler).__name__ for handler in logging.getLogger().handlers] == ["_DroppingQueueHandler"]
+    logging.getLogger("src.test").info("hello from the request thread")
+    stop_logging()
+    assert not listener.queue.qsize()
+    assert any(line.endswith("hello from the request thread") for line in _log_lines(log_dir))
+
+def test_sampling_keeps_one_in_n_below_warning(log_dir):
+    setup_logging(str(log_dir), sample_rates={"src.noisy": 10})
+    noisy = logging.getLogger("src.noisy.child")
+    for i in range(100):
+        noisy.info(f"tick {i}")
+    noisy.warning("always kept")
+    stop_logging()
+    lines = _log_lines(log_dir)
+    assert sum("tick" in line for line in lines) == 10
+    assert any("always kept" in line for line in lines)
+
+def test_advice_records_are_json_lines(log_dir, make_config):
+    records_path = log_dir / "advice.jsonl"
+    setup_logging(str(log_dir), advice_records_path=str(records_path))
+    advisor = BaccaratLLMAdvisor(make_config(enabled=False, llm_mode="never"))
+    advice = advisor.get_advice("T1", test_scenarios[0])
+    stop_logging()
+
+    (line,) = records_path.read_text(encoding="utf-8").splitlines()
+    record = json.loads(line)
+    assert record["gmcode"] == "T1"
+    assert record["decision"] == "player"
+    assert record["text"] == advice
+    assert record["cards"][0] == [1, 1]
+    # Advice records stay out of the main log
+    assert not any("advice" == line.rsplit(" - ", 1)[-1] for line in _log_lines(log_dir))
+
+def test_full_queue_keeps_warnings_and_reports_drops():
+    log_queue = queue.Queue(maxsize=2)
+    queue_handler = _DroppingQueueHandler(log_queue)
+    logger = logging.getLogger("src.test.full_queue")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(queue_handler)
+    try:
+        for i in range(3):
+            logger.info(f"info {i}")
+        assert queue_handler.dropped == 1
+        # The warning takes the place of the oldest info record
+        logger.warning("kept")
+        assert queue_handler.dropped == 2
+        assert [record.getMessage() for record in log_queue.queue] == ["info 1", "kept"]
+    finally:
+        logger.removeHandler(queue_handler)
+        logger.setLevel(logging.NOTSET)
+        logger.propagate = True
+
+    written = []
+    handler = logging.Handler()
+    handler.emit = written.append
+    listener = _BatchingQueueListener(log_queue, handler, queue_handler=queue_handler)
+    listener.start()
+    listener.stop()
+    messages = [record.getMessage() for record in written]
+    assert messages[:2] == ["info 1", "kept"]
+    assert "Dropped 2 log records" in messages[-1]
+
+def test_stop_waits_for_room_in_a_full_queue():
+    log_queue = queue.Queue(maxsize=2)
+    release = threading.Event()
+    written = []
+    handler = logging.Handler()
+    handler.emit = lambda record: (release.wait(), written.append(record))
+    listener = _BatchingQueueListener(log_queue, handler)
+    listener.start()
+    records = [logging.makeLogRecord({"msg": f"record {i}", "levelno": logging.INFO}) for i in range(3)]
+    log_queue.put(records[0])
+    # The writer is stuck on the first record while the other two fill the queue
+    while not log_queue.empty():
+        time.sleep(0.01)
+    log_queue.put(records[1])
+    log_queue.put(records[2])
+    threading.Timer(0.1, release.set).start()
+    listener.stop()
+    assert written == records
@@ -0,0 +1,41 @@
+import json
+from src.advisor import BaccaratLLMAdvisor
+from src.metrics import MetricsRegistry, metrics
+from tests.test_scenarios import test_scenarios
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.observe_stage("probabilities", 0.0003, gmcode="T1", model="tiny")
+    registry.observe_stage("probabilities", 2.0, gmcode="T1", model="tiny")
+    registry.inc("advisor_generated_tokens_total", 12, gmcode="T1", model="tiny")
+    text = registry.to_prometheus()
+    assert "# TYPE advisor_stage_seconds histogram" in text
+    assert 'advisor_stage_seconds_bucket{gmcode="T1",model="tiny",stage="probabilities",le="0.0005"} 1' in text
+    assert 'advisor_stage_seconds_bucket{gmcode="T1",model="tiny",stage="probabilities",le="+Inf"} 2' in text
+    assert 'advisor_stage_seconds_count{gmcode="T1",model="tiny",stage="probabilities"} 2' in text
+    assert 'advisor_generated_tokens_total{gmcode="T1",model="tiny"} 12' in text
+
+def test_get_advice_records_every_stage(tiny_model_path, make_config, tmp_path):
+    metrics.reset()
+    advisor = BaccaratLLMAdvisor(make_config(
+        model_path=tiny_model_path, use_gpu=False, max_new_tokens=8,
+        metrics_json_path=str(tmp_path / "metrics.json"),
+        metrics_prometheus_path=str(tmp_path / "metrics.prom"),
+    ))
+    advisor.get_advice("T1", test_scenarios[4])
+    advisor.export_metrics()
+
+    snapshot = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+    stages = {h["labels"]["stage"] for h in snapshot["histograms"] if h["name"] == "advisor_stage_seconds"}
+    assert {"format_cards", "probabilities", "build_prompt", "tokenize", "prefill", "decode", "detokenize", "total"} <= stages
+    labels = snapshot["histograms"][0]["labels"]
+    assert labels["gmcode"] == "T1" and labels["model"] == "tiny_model"
+    assert any(h["name"] == "advisor_decode_tokens_per_second" for h in snapshot["histograms"])
+    assert "advisor_requests_total" in (tmp_path / "metrics.prom").read_text(encoding="utf-8")
+
+def test_cprofile_hook_writes_profile(make_config, tmp_path):
+    advisor = BaccaratLLMAdvisor(make_config(
+        enabled=False, llm_mode="never", profile="cprofile", profile_dir=str(tmp_path / "profiles")
+    ))
+    advisor.get_advice("T1", test_scenarios[0])
+    assert list((tmp_path / "profiles").glob("T1_*.prof"))
@@ -0,0 +1,95 @@
+import json
+from src.advisor import BaccaratLLMAdvisor
+from src.model_loader import LLMModelLoader, clear_model_registry
+from tests.test_scenarios import test_scenarios
+
+def test_lazy_loader_loads_on_first_use(tiny_model_path):
+    loader = LLMModelLoader(tiny_model_path, use_gpu=False, lazy=True)
+    assert not loader.is_loaded
+    assert loader.model is not None
+    assert loader.is_loaded
+
+def test_loaders_share_one_model(tiny_model_path):
+    first = LLMModelLoader(tiny_model_path, use_gpu=False)
+    second = LLMModelLoader(tiny_model_path, use_gpu=False)
+    assert first.model is second.model
+    assert first.tokenizer is second.tokenizer
+
+def test_rule_only_requests_do_not_load_model(tiny_model_path, make_config):
+    advisor = BaccaratLLMAdvisor(make_config(model_path=tiny_model_path, use_gpu=False, llm_mode="auto"))
+    advisor.get_advice("T1", test_scenarios[0])  # Player natural, answered by rules
+    assert not advisor.model_loader.is_loaded
+
+def test_warmup_loads_and_caches_prefix(tiny_model_path, make_config):
+    advisor = BaccaratLLMAdvisor(make_config(model_path=tiny_model_path, use_gpu=False, warmup=True))
+    assert advisor.model_loader.is_loaded
+    assert advisor.model_loader._prefix_cache is not None
+
+def test_int8_model_is_saved_and_reloaded(tiny_model_path, tmp_path):
+    quantized_path = str(tmp_path / "tiny-int8.pt")
+    fresh = LLMModelLoader(tiny_model_path, use_gpu=False, quantization="int8_dynamic", quantized_model_path=quantized_path)
+    assert type(fresh.model.lm_head).__module__.startswith("torch.ao.nn.quantized")
+    expected = fresh.generate("您的建议：", max_new_tokens=8)
+
+    clear_model_registry()
+    reloaded = LLMModelLoader(tiny_model_path, use_gpu=False, quantization="int8_dynamic", quantized_model_path=quantized_path)
+    assert reloaded.model is not fresh.model
+    # The skeleton's meta parameters were all replaced by the saved weights
+    assert not any(tensor.is_meta for tensor in reloaded.model.state_dict().values() if hasattr(tensor, "is_meta"))
+    assert reloaded.generate("您的建议：", max_new_tokens=8).tolist() == expected.tolist()
+
+    # Weights saved by another torch version are quantized again instead of loaded
+    with open(f"{quantized_path}.json", "r", encoding="utf-8") as file:
+        metadata = json.load(file)
+    assert metadata["quantization"] == "int8_dynamic"
+    with open(f"{quantized_path}.json", "w", encoding="utf-8") as file:
+        json.dump({**metadata, "torch_version": "0.0"}, file)
+    clear_model_registry()
+    requantized = LLMModelLoader(tiny_model_path, use_gpu=False, quantization="int8_dynamic", quantized_model_path=quantized_path)
+    assert requantized.generate("您的建议：", max_new_tokens=8).tolist() == expected.tolist()
+    with open(f"{quantized_path}.json", "r", encoding="utf-8") as file:
+        assert json.load(file) == metadata
+
+def test_unknown_quantization_leaves_model_unavailable(tiny_model_path):
+    loader = LLMModelLoader(tiny_model_path, use_gpu=False, quantization="int3")
+    assert loader.model is None
+
+def _make_draft_model(tiny_model_path, path):
+    """Tiny model with perturbed weights, so only some of its tokens are accepted."""
+    import shutil
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    model = AutoModelForCausalLM.from_pretrained(tiny_model_path)
+    torch.manual_seed(1)
+    with torch.no_grad():
+        for parameter in model.parameters():
+            parameter.add_(torch.randn_like(parameter) * 0.02)
+    model.save_pretrained(path)
+    for name in ("tokenizer.json", "tokenizer_config.json"):
+        shutil.copy(f"{tiny_model_path}/{name}", path)
+    return str(path)
+
+def test_assisted_decoding_matches_greedy(tiny_model_path, tmp_path):
+    draft_path = _make_draft_model(tiny_model_path, tmp_path / "draft")
+    greedy = LLMModelLoader(tiny_model_path, use_gpu=False)
+    assisted = LLMModelLoader(tiny_model_path, use_gpu=False, draft_model_path=draft_path)
+    assert assisted.draft_model is not None
+    for loader in (greedy, assisted):
+        loader.set_prompt_prefix("您的建议：")
+
+    kwargs = {"max_new_tokens": 24, "min_new_tokens": 24, "do_sample": False}
+    timings = {}
+    expected = greedy.generate("玩家牌：A Spade", **kwargs)
+    assert assisted.generate("玩家牌：A Spade", timings=timings, **kwargs).tolist() == expected.tolist()
+    assert timings["draft_tokens"] > 0
+    assert 0 <= timings["acceptance_rate"] <= 1
+
+def test_batch_keeps_pad_token_id_zero(tiny_model_path, monkeypatch):
+    loader = LLMModelLoader(tiny_model_path, use_gpu=False)
+    monkeypatch.setattr(loader.tokenizer, "pad_token", loader.tokenizer.convert_ids_to_tokens(0))
+    assert loader.tokenizer.pad_token_id == 0
+    calls = []
+    monkeypatch.setattr(loader.model, "generate", lambda **kwargs: calls.append(kwargs))
+    loader.generate_batch(["您的建议："], max_new_tokens=1)
+    assert calls[0]["pad_token_id"] == 0
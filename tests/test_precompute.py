@@ -0,0 +1,58 @@
+from src.advisor import BaccaratLLMAdvisor
+from src.metrics import metrics
+from src.precompute import hand_is_final, initial_cards_dealt, next_card_index
+from tests.test_scenarios import MockCardInfo
+
+def test_next_card_index():
+    assert next_card_index([MockCardInfo(1, 1), MockCardInfo(2, 2)]) == 3
+    # Player 9 natural: hand complete
+    assert next_card_index([MockCardInfo(1, 1), MockCardInfo(2, 2), MockCardInfo(3, 8), MockCardInfo(4, 3)]) is None
+    # Player 3 draws
+    assert next_card_index([MockCardInfo(1, 1), MockCardInfo(2, 2), MockCardInfo(3, 2), MockCardInfo(4, 3)]) == 5
+    # Player 7 stands, Banker 5 draws
+    assert next_card_index([MockCardInfo(1, 3), MockCardInfo(2, 2), MockCardInfo(3, 4), MockCardInfo(4, 3)]) == 6
+    # Player drew an 8, Banker 3 stands
+    assert next_card_index([MockCardInfo(1, 1), MockCardInfo(2, 1), MockCardInfo(3, 2),
+                            MockCardInfo(4, 2), MockCardInfo(5, 8)]) is None
+
+def test_next_card_is_served_from_precomputed_state(make_config):
+    config = make_config(enabled=False, llm_mode="never", precompute_next_cards=True)
+    precomputing = BaccaratLLMAdvisor(config)
+    plain = BaccaratLLMAdvisor(make_config(enabled=False, llm_mode="never"))
+    metrics.reset()
+
+    hand = [MockCardInfo(1, 1), MockCardInfo(2, 2), MockCardInfo(3, 2)]
+    for advisor in (precomputing, plain):
+        advisor.get_advice("T1", hand)
+    precomputing.precomputer.wait("T1")
+
+    for card in (MockCardInfo(4, 3), MockCardInfo(5, 20)):
+        hand = hand + [card]
+        assert precomputing.get_advice("T1", hand) == plain.get_advice("T1", hand)
+        precomputing.precomputer.wait("T1")
+    counters = {c["labels"]["result"]: c["value"] for c in metrics.snapshot()["counters"]
+                if c["name"] == "advisor_precompute_total"}
+    assert counters == {"miss": 1, "hit": 2}
+    precomputing.precomputer.close()
+
+def test_precomputed_state_requires_matching_shoe(make_config):
+    advisor = BaccaratLLMAdvisor(make_config(enabled=False, llm_mode="never", precompute_next_cards=True))
+    hand = [MockCardInfo(1, 1), MockCardInfo(2, 2), MockCardInfo(3, 2)]
+    advisor.get_advice("T1", hand)
+    advisor.precomputer.wait("T1")
+    next_hand = hand + [MockCardInfo(4, 3)]
+    deck = advisor.shoe_tracker.get("T1").copy()
+    deck.draw(2)
+    assert advisor.precomputer.lookup("T1", next_hand, deck) is not None
+    deck.draw(5)
+    assert advisor.precomputer.lookup("T1", next_hand, deck) is None
+    advisor.precomputer.close()
+
+def test_hand_is_final_needs_the_initial_cards():
+    two_cards = [MockCardInfo(1, 2), MockCardInfo(2, 43)]
+    assert not initial_cards_dealt(two_cards)
+    assert not hand_is_final(two_cards)
+    # Player natural 9 against Banker 4
+    natural = two_cards + [MockCardInfo(3, 7), MockCardInfo(4, 10)]
+    assert initial_cards_dealt(natural)
+    assert hand_is_final(natural)
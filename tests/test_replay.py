@@ -0,0 +1,101 @@
+import json
+import pytest
+from src.advisor import BaccaratLLMAdvisor
+from src.replay import HandReplayer
+from tests.test_scenarios import test_scenarios
+
+def _write_hands(path, copies=2):
+    with open(path, "w", encoding="utf-8") as file:
+        for i in range(copies):
+            for j, scenario in enumerate(test_scenarios):
+                cards = [[card.index, card.classid] for card in scenario]
+                file.write(json.dumps({"gmcode": f"T{j}", "cards": cards, "final_cards": cards}) + "\n")
+        file.write("not json\n")
+
+def _read_results(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+def test_replay_writes_one_result_per_record(tmp_path, make_config):
+    hands_path = str(tmp_path / "hands.jsonl")
+    output_path = str(tmp_path / "results.jsonl")
+    _write_hands(hands_path)
+    advisor = BaccaratLLMAdvisor(make_config(enabled=False))
+    summary = HandReplayer(advisor, batch_size=5).run(hands_path, output_path)
+
+    results = _read_results(output_path)
+    assert [result["record"] for result in results] == list(range(2 * len(test_scenarios) + 1))
+    assert "error" in results[-1]
+    assert summary["hands"] == 2 * len(test_scenarios)
+    assert summary["errors"] == 1
+    assert summary["hands_per_second"] > 0
+    # Complete hands: the rules pick the known winner, so every bet wins
+    assert all(result["profit"] > 0 for result in results[:-1] if result["decision"] != "no_bet")
+
+def test_csv_input(tmp_path, make_config):
+    hands_path = tmp_path / "hands.csv"
+    hands_path.write_text("gmcode,cards,winner\nT1,1:1 2:14 3:8 4:17,player\n", encoding="utf-8")
+    advisor = BaccaratLLMAdvisor(make_config(enabled=False))
+    summary = HandReplayer(advisor).run(str(hands_path), str(tmp_path / "results.jsonl"))
+    assert summary["hands"] == 1
+    assert summary["profit"] == 1.0
+
+def test_interrupted_replay_resumes_from_checkpoint(tmp_path, make_config, monkeypatch):
+    hands_path = str(tmp_path / "hands.jsonl")
+    _write_hands(hands_path)
+    config = make_config(enabled=False, probability_method="monte_carlo", num_simulations=200, random_seed=0)
+
+    expected_path = str(tmp_path / "expected.jsonl")
+    expected = HandReplayer(BaccaratLLMAdvisor(config), batch_size=3).run(hands_path, expected_path)
+
+    output_path = str(tmp_path / "results.jsonl")
+    checkpoint_path = str(tmp_path / "replay.ckpt.json")
+    replayer = HandReplayer(BaccaratLLMAdvisor(config), batch_size=3)
+    process_batch = replayer.process_batch
+    calls = []
+    def failing_process_batch(records, start_position):
+        calls.append(start_position)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return process_batch(records, start_position)
+    monkeypatch.setattr(replayer, "process_batch", failing_process_batch)
+    with pytest.raises(KeyboardInterrupt):
+        replayer.run(hands_path, output_path, checkpoint_path)
+
+    resumed = HandReplayer(BaccaratLLMAdvisor(config), batch_size=3).run(hands_path, output_path, checkpoint_path)
+    assert _read_results(output_path) == _read_results(expected_path)
+    for key in ("hands", "errors", "bets", "profit"):
+        assert resumed[key] == expected[key]
+
+def test_replay_with_llm(tmp_path, tiny_model_path, make_config):
+    hands_path = str(tmp_path / "hands.jsonl")
+    _write_hands(hands_path, copies=1)
+    advisor = BaccaratLLMAdvisor(make_config(model_path=tiny_model_path, use_gpu=False, max_new_tokens=4, llm_mode="auto"))
+    summary = HandReplayer(advisor, use_llm=True).run(hands_path, str(tmp_path / "results.jsonl"))
+    assert summary["llm_hands"] > 0
+    results = _read_results(str(tmp_path / "results.jsonl"))
+    assert all("advice" in result for result in results if result.get("source") == "llm")
+
+def test_out_of_range_cards_are_record_errors(tmp_path, make_config):
+    hands_path = tmp_path / "hands.jsonl"
+    good = [[1, 1], [2, 14], [3, 8], [4, 17]]
+    records = [good[:3] + [[4, 53]], good[:3] + [[4, 0]], good + [[7, 2]], good]
+    hands_path.write_text("".join(json.dumps({"gmcode": "T1", "cards": cards}) + "\n" for cards in records),
+                          encoding="utf-8")
+    advisor = BaccaratLLMAdvisor(make_config(enabled=False))
+    summary = HandReplayer(advisor).run(str(hands_path), str(tmp_path / "results.jsonl"))
+    assert summary["errors"] == 3
+    assert summary["hands"] == 1
+    # The rejected cards never reached the tracked shoe
+    assert sum(advisor.shoe_tracker.get("T1").counts) == 8 * 52 - 4
+
+def test_monte_carlo_batches_use_their_own_seeds(tmp_path, make_config):
+    hands_path = tmp_path / "hands.jsonl"
+    cards = [[card.index, card.classid] for card in test_scenarios[4]]
+    hands_path.write_text("".join(json.dumps({"gmcode": f"T{i}", "cards": cards}) + "\n" for i in range(2)),
+                          encoding="utf-8")
+    advisor = BaccaratLLMAdvisor(make_config(enabled=False, probability_method="monte_carlo",
+                                             num_simulations=200, random_seed=0))
+    HandReplayer(advisor, batch_size=1).run(str(hands_path), str(tmp_path / "results.jsonl"))
+    first, second = _read_results(str(tmp_path / "results.jsonl"))
+    assert first["probabilities"] != second["probabilities"]
@@ -0,0 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
+from src.advisor import BaccaratLLMAdvisor
+from tests.test_scenarios import test_scenarios
+
+def test_concurrent_tables_are_batched(tiny_model_path, make_config):
+    serial = BaccaratLLMAdvisor(make_config(model_path=tiny_model_path, use_gpu=False, max_new_tokens=16))
+    batched = BaccaratLLMAdvisor(make_config(
+        model_path=tiny_model_path, use_gpu=False, max_new_tokens=16,
+        batch_inference=True, batch_max_size=4, batch_window_ms=200
+    ))
+    batch_sizes = []
+    generate_batch = batched.model_loader.generate_batch
+    def record_batch(prompts, **kwargs):
+        batch_sizes.append(len(prompts))
+        return generate_batch(prompts, **kwargs)
+    batched.model_loader.generate_batch = record_batch
+
+    # One table per scenario, so every call sees a fresh shoe
+    with ThreadPoolExecutor(max_workers=len(test_scenarios)) as pool:
+        results = list(pool.map(lambda i: batched.get_advice(f"T{i}", test_scenarios[i]), range(len(test_scenarios))))
+    batched.scheduler.close()
+
+    assert max(batch_sizes) > 1
+    assert sum(batch_sizes) == len(test_scenarios)
+    for i, scenario in enumerate(test_scenarios):
+        assert results[i] == serial.get_advice(f"T{i}", scenario)
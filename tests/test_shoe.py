@@ -0,0 +1,43 @@
+import pytest
+from src.baccarat_stats import calculate_win_probabilities
+from src.shoe import ShoeState, ShoeTracker
+from tests.test_scenarios import MockCardInfo
+
+def test_observe_is_incremental():
+    tracker = ShoeTracker(num_decks=8)
+    hand = [MockCardInfo(1, 1), MockCardInfo(2, 14)]
+    tracker.observe("T1", hand)
+    # Same cards seen again plus one new card: only the new card is removed
+    shoe = tracker.observe("T1", hand + [MockCardInfo(3, 2)])
+    assert shoe.remaining == 416 - 3
+    assert shoe.counts[0] == 32 - 2  # two aces dealt
+    assert shoe.counts[1] == 32 - 1
+
+def test_new_hand_and_new_shoe():
+    tracker = ShoeTracker(num_decks=1)
+    tracker.observe("T1", [MockCardInfo(1, 1), MockCardInfo(2, 2)])
+    # A different card at a known index starts a new hand; earlier cards stay out of the shoe
+    shoe = tracker.observe("T1", [MockCardInfo(1, 3)])
+    assert shoe.remaining == 49
+    assert tracker.get("T2").remaining == 52
+    tracker.new_shoe("T1")
+    assert tracker.get("T1").remaining == 52
+
+def test_exhausted_rank_starts_new_shoe():
+    tracker = ShoeTracker(num_decks=1)
+    for classid in (1, 14, 27, 40):
+        tracker.observe("T1", [MockCardInfo(1, classid)])
+    # A fifth ace cannot come from the same single-deck shoe
+    shoe = tracker.observe("T1", [MockCardInfo(1, 1)])
+    assert shoe.remaining == 51
+    assert shoe.counts[0] == 3
+
+def test_single_deck_shoe_matches_default_deck():
+    shoe = ShoeState(num_decks=1)
+    for rank in (9, 12, 2, 3):  # 10, K, 3, 4
+        shoe.draw(rank)
+    player_hand, banker_hand = [10, 26], [42, 43]  # 10 Spade, K Heart / 3 Club, 4 Club
+    from_shoe = calculate_win_probabilities(player_hand, banker_hand, shoe)
+    from_default = calculate_win_probabilities(player_hand, banker_hand, [])
+    for outcome in ('player', 'banker', 'tie'):
+        assert from_shoe[outcome] == pytest.approx(from_default[outcome])
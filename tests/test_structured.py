@@ -0,0 +1,72 @@
+from src.advisor import BaccaratLLMAdvisor
+from src.decision import DECISION_LABELS, StructuredAdvice
+from src.model_loader import LLMModelLoader
+from src.structured import StructuredDecoding
+from tests.test_scenarios import test_scenarios
+
+def test_generation_starts_with_a_decision_code(tiny_model_path):
+    loader = LLMModelLoader(tiny_model_path, use_gpu=False)
+    decoding = StructuredDecoding(loader.tokenizer, max_explanation_tokens=0)
+    timings = {}
+    output_ids = loader.generate("您的建议：", timings=timings, **decoding.generate_kwargs())
+    text = loader.tokenizer.decode(output_ids[0, -timings["generated_tokens"]:], skip_special_tokens=True)
+    assert text in DECISION_LABELS.values()
+
+def test_stop_string_needs_explanation_text(tiny_model_path):
+    import torch
+
+    tokenizer = LLMModelLoader(tiny_model_path, use_gpu=False).tokenizer
+    decoding = StructuredDecoding(tokenizer, max_explanation_tokens=32)
+    decoding.prompt_length = 0
+    code = decoding.sequences[0]
+
+    def stopped(explanation):
+        input_ids = torch.tensor([code + tokenizer(explanation, add_special_tokens=False).input_ids])
+        return bool(decoding.stop_explanation(input_ids, None)[0])
+    assert not stopped("\n")
+    assert not stopped("\n 因为")
+    assert stopped("\n因为期望值最高\n")
+
+def test_structured_advice_from_llm(tiny_model_path, make_config):
+    advisor = BaccaratLLMAdvisor(make_config(
+        model_path=tiny_model_path, use_gpu=False, structured_output=True, structured_max_explanation_tokens=6
+    ))
+    generated = []
+    generate = advisor.model_loader.generate
+    def record_generate(prompt_suffix, timings=None, **kwargs):
+        output_ids = generate(prompt_suffix, timings=timings, **kwargs)
+        generated.append(timings["generated_tokens"])
+        return output_ids
+    advisor.model_loader.generate = record_generate
+
+    advice = advisor.get_advice("T1", test_scenarios[1])
+    assert isinstance(advice, StructuredAdvice)
+    assert advice.source == "llm"
+    assert advice.text.startswith(DECISION_LABELS[advice.decision])
+    assert abs(sum(advice.probabilities.values()) - 100.0) < 1e-9
+    assert set(advice.expected_values) == {"player", "banker", "tie"}
+    max_code = max(len(advisor.model_loader.tokenizer(label, add_special_tokens=False).input_ids)
+                   for label in DECISION_LABELS.values())
+    assert generated[0] <= max_code + 6
+
+def test_structured_advice_from_rules(make_config):
+    advisor = BaccaratLLMAdvisor(make_config(enabled=False, llm_mode="never", structured_output=True))
+    advice = advisor.get_advice("T1", test_scenarios[0])  # Player natural 9 vs 5
+    assert advice.source == "rules"
+    assert advice.decision == "player"
+    assert str(advice) == advice.text
+    assert BaccaratLLMAdvisor(make_config(enabled=False, llm_mode="never")).get_advice("T1", test_scenarios[0]) == advice.text
+
+def test_stream_is_structured_too(tiny_model_path, make_config):
+    advisor = BaccaratLLMAdvisor(make_config(
+        model_path=tiny_model_path, use_gpu=False, structured_output=True, structured_max_explanation_tokens=6,
+        advice_cache=True
+    ))
+    timings = {}
+    streamed = "".join(advisor.get_advice_stream("T1", test_scenarios[1], timings)).strip()
+    assert timings["decision"] is not None
+    assert streamed.startswith(DECISION_LABELS[timings["decision"]])
+    # A structured get_advice served from the stream's cache entry keeps the same contract
+    advice = advisor.get_advice("T2", test_scenarios[1])
+    assert advice.decision == timings["decision"]
+    assert advice.text == streamed